@@ -2,21 +2,37 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkinter.scrolledtext import ScrolledText
 from pathlib import Path
+import asyncio
 import base64
+import bisect
+import functools
+import io
 import json
+import logging
 import re
 import os
 import mimetypes
 from InsetNIP import insert_food_record, COLUMNS as NIP_COLUMNS, DB_PATH as NIP_DB_PATH
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx  # installed with openai
 import tiktoken
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable
 import threading
+import time
+import concurrent.futures
+from collections import OrderedDict
 try:
-    from PIL import Image, ImageTk  # optional; used for nicer thumbnails if installed
+    from PIL import Image, ImageOps, ImageTk  # optional; used for nicer thumbnails if installed
 except ImportError:
     Image = None
+    ImageOps = None
     ImageTk = None
+try:
+    import orjson  # optional; faster chat-file parsing and silent saves
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 # --- GUI Layout Constants ---
 WINDOW_WIDTH = 1000
@@ -33,7 +49,18 @@ TEXT_W = WINDOW_W - 20
 TEXT_H = WINDOW_HEIGHT - 80
 
 STATE_FILE = ".textpad_state.json"   # stored next to this .py file
+PERSIST_DEBOUNCE_MS = 150   # state-file writes requested within this window are merged
+MODELS_CACHE_FILE = ".models_cache.json"   # stored next to this .py file; untracked (account-specific)
+MODELS_CACHE_TTL_S = 24 * 60 * 60   # reuse the model list saved in MODELS_CACHE_FILE for this long
 CHAT_AUTOSAVE_FILE = "_autosave.chat.json"   # lives in base_dir (system_prompts folder)
+TIKTOKEN_CACHE_DIR = ".tiktoken_cache"   # stored next to this .py file
+
+# Keep tiktoken's downloaded BPE files in a stable folder rather than the OS temp dir,
+# so the encoder loads from disk on every launch (an existing env setting wins)
+os.environ.setdefault(
+    "TIKTOKEN_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), TIKTOKEN_CACHE_DIR)
+)
 
 MODEL_CMB_X = 57
 MODEL_CMB_Y = 10
@@ -68,68 +95,256 @@ NIP_BUTTON_Y = SOURCES_BUTTON_Y - NIP_BUTTON_HEIGHT - 6  # stack above sources w
 INPUT_WIDTH = SOURCES_BUTTON_X - 8 - INPUT_X
 
 SRC_BTN_LABEL = "Show sources"
+MODELS_LOADING_LABEL = "Loading models…"
+THUMB_SIZE = 36  # attachment thumbnail edge, in pixels
+MAX_IMAGE_SIDE = 2048  # longer photo edges are downscaled to this before upload (needs Pillow)
+B64_CHUNK_BYTES = 3 * 64 * 1024  # photo bytes base64-encoded per step (multiple of 3)
+IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # total data URL size kept for re-attaching unchanged photos
+TRANSCRIPT_FLUSH_MS = 50  # streamed text is written to the transcript at most once per this window
 NIP_BTN_LABEL = "Insert NIP"
 
 # --- API Models related ---
 ENABLE_HOSTED_WEB_SEARCH = True  # Turn this on to use the hosted web search tool
+WEB_SEARCH_TOOLS: List[Dict[str, Any]] = [{"type": "web_search"}]  # shared by every browsing request; never mutated
+DEBUG_LOG_HISTORY = bool(os.environ.get("CHATBOT_DEBUG"))  # Print the system prompt and the whole chat history to the console on every turn
 DEFAULT_MODEL = "" # Non-browsing model (or used without tools)
 BROWSE_MODEL = "" # Browsing-capable model for hosted web search "gpt-4o"
 MODEL_OPTIONS: List[str] = []
+# Model ids containing any of these are not intended for standard completions/chat
+MODEL_SKIP_REGEX = re.compile(r"embedding|audio|search|realtime|preview|transcribe|tts")
+# Retries for 429/5xx/connection errors; the SDK backs off exponentially with jitter (0.5 s up to 8 s)
+API_MAX_RETRIES = 4
+API_CONNECT_TIMEOUT_S = 10.0  # fail fast on a dead network
+API_READ_TIMEOUT_S = 600.0  # reasoning/browsing models can think for minutes before the first token
+TOKEN_BATCH_THREADS = os.cpu_count() or 8  # tiktoken worker threads for bulk counts (e.g. a restored chat)
+SUMMARY_MIN_SHARE = 0.3  # below this share of max_tokens, old messages are dropped rather than summarized
+SUMMARY_PREFIX = "Summary of earlier conversation: "  # marks the running summary message in chat_history
 #str_system_prompt = "You are a helpful AI assistant. Answer questions to the best of your ability."
+DEFAULT_SYSTEM_PROMPT = "You are a helpfull assistant"  # used until the editor supplies a prompt
 
+# Match a URL and drop trailing punctuation in one pass: the last character may not be
+# one of ").,;:]", and ")", quotes and angle brackets never appear inside a match, so
+# backtracking stays bounded and "<https://...>" / quoted links are cut cleanly. "]" is
+# allowed inside (query arrays, IPv6 hosts) and only trimmed from the end.
 URL_REGEX = re.compile(
-    r"(https?://[^\s)]+)",
+    r"https?://[^\s)\"'<>]*[^\s)\]\"'<>.,;:]",
     re.IGNORECASE
 )
 
-def _dedupe_preserve_order(items: List[str]) -> List[str]:
-    seen: Set[str] = set()
-    out: List[str] = []
-    for it in items:
-        if it not in seen:
-            seen.add(it)
-            out.append(it)
-    return out
+# Message content part types (chat history uses both the Chat and Responses API spellings)
+TEXT_PART_TYPES = frozenset({"text", "input_text", "output_text"})
+IMAGE_PART_TYPES = frozenset({"image_url", "input_image"})
+
+# Structured response fields that hold citation links
+CITATION_URL_KEYS = frozenset({"url", "source", "href"})
+URL_SCHEMES = ("http://", "https://")
+CITATION_LEAF_TYPES = frozenset({int, float, bool, type(None), bytes})  # never hold a citation
+
+# Model ids that use the o200k_base tokenizer when tiktoken has no explicit mapping
+LONG_CTX_MODEL_REGEX = re.compile(r"gpt-5|4\.1|4o|o[34]|200k")
+
+# Filename sanitizing (see ChatbotApp._sanitize_filename)
+FILENAME_UNSAFE_REGEX = re.compile(r"[^A-Za-z0-9._ \-]")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+def _dedupe_preserve_order(items: Iterable[str]) -> List[str]:
+    # dicts keep insertion order, so this de-dupes in a single C-level pass
+    return list(dict.fromkeys(items))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoder(model: str) -> tiktoken.Encoding:
+    """
+    tiktoken mapping with a safe fallback for new model names.
+    Cached per model so the BPE tables are only loaded once per process.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding_name = "o200k_base" if LONG_CTX_MODEL_REGEX.search(model) else "cl100k_base"
+        print(f"[Tokens] No tiktoken mapping for '{model}', using {encoding_name}")
+        return tiktoken.get_encoding(encoding_name)
+
+
+def _make_http_client() -> httpx.AsyncClient:
+    """
+    One pooled keep-alive HTTP client for the bot's AsyncOpenAI instance, so turns reuse
+    the TLS connection. Uses HTTP/2 when the optional h2 package is installed.
+    """
+    try:
+        import h2  # type: ignore  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return DefaultAsyncHttpxClient(http2=http2)
+
+
+def _loads_json(data: bytes) -> Any:
+    """Parse a saved chat file (UTF-8 bytes), with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_json(obj: Any, pretty: bool = False) -> bytes:
+    """
+    UTF-8 JSON for chat files. pretty=True (indent=2) is for files the user saves explicitly;
+    silent saves (autosave, save-on-exit) are compact and use orjson when it is installed.
+    """
+    if not pretty:
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj)
+            except TypeError:
+                pass  # e.g. values orjson cannot serialize; fall back to json
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """
+    Write data to a sibling temp file, then swap it into place with os.replace,
+    so a crash mid-write never leaves a truncated state/chat file behind.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]  # os.write may write less than asked
+        os.fsync(fd)  # contents are on disk before the rename makes them visible
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+# (path, mtime_ns, size, thumb_size) -> (data URL, thumbnail), least recently used first.
+# Bounded by the total data URL size rather than an entry count: without Pillow nothing is
+# downscaled, so a handful of raw photos could otherwise hold hundreds of MB.
+_image_cache: "OrderedDict[Tuple[str, int, int, int], Tuple[str, Optional[Any]]]" = OrderedDict()
+_image_cache_bytes = 0
+_image_cache_lock = threading.Lock()  # the image pool reads and fills the cache from several threads
+
+
+def _load_image_file(path: str, mtime_ns: int, size: int, thumb_size: int) -> Tuple[str, Optional[Any]]:
+    """
+    (base64 data URL, small PIL thumbnail or None) for an image, from the cache when the
+    same unchanged file was loaded recently. mtime_ns/size are part of the cache key so an
+    edited file is re-read.
+    """
+    global _image_cache_bytes
+    key = (path, mtime_ns, size, thumb_size)
+    with _image_cache_lock:
+        cached = _image_cache.get(key)
+        if cached is not None:
+            _image_cache.move_to_end(key)
+            return cached
+    result = _read_image_file(path, thumb_size)
+    nbytes = len(result[0])
+    if nbytes <= IMAGE_CACHE_MAX_BYTES:
+        with _image_cache_lock:
+            if key not in _image_cache:
+                _image_cache[key] = result
+                _image_cache_bytes += nbytes
+                while _image_cache_bytes > IMAGE_CACHE_MAX_BYTES:
+                    _, (old_url, _) = _image_cache.popitem(last=False)
+                    _image_cache_bytes -= len(old_url)
+    return result
+
+
+def _read_image_file(path: str, thumb_size: int) -> Tuple[str, Optional[Any]]:
+    """
+    Read an image once and return (base64 data URL, small PIL thumbnail or None).
+    Photos larger than MAX_IMAGE_SIDE are downscaled before encoding (Pillow only);
+    one decode feeds both the upload copy and the thumbnail.
+    """
+    mime, _ = mimetypes.guess_type(path)
+    if not mime:
+        mime = "image/png"
+    with open(path, "rb") as f:
+        data = f.read()
+    thumb = None
+    if Image:
+        try:
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            # Phone photos store rotation as an EXIF tag; apply it to the pixels so the
+            # re-encoded copy (and the thumbnail) are upright. The returned image keeps the
+            # rest of the EXIF data with the orientation reset, and the save below keeps it.
+            img = ImageOps.exif_transpose(img)
+            exif = img.info.get("exif", b"")
+            if max(img.size) > MAX_IMAGE_SIDE:
+                img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+                out = io.BytesIO()
+                if mime == "image/png" or img.mode in ("RGBA", "LA", "P"):
+                    img.save(out, format="PNG", optimize=True, exif=exif)
+                    mime = "image/png"
+                else:
+                    img.convert("RGB").save(out, format="JPEG", quality=85, optimize=True, exif=exif)
+                    mime = "image/jpeg"
+                data = out.getvalue()
+            thumb = img.copy()
+            thumb.thumbnail((thumb_size, thumb_size))
+        except Exception:
+            thumb = None  # unreadable by Pillow: send the original bytes as-is
+    # Encode straight into one buffer that already holds the "data:" prefix. Chunks are a
+    # multiple of 3 bytes so no padding appears mid-stream; this avoids holding a full-size
+    # base64 copy plus a concatenated copy of the URL at the same time.
+    buf = bytearray(f"data:{mime};base64,".encode("ascii"))
+    view = memoryview(data)
+    for start in range(0, len(data), B64_CHUNK_BYTES):
+        buf += base64.b64encode(view[start:start + B64_CHUNK_BYTES])
+    view.release()
+    del data
+    return buf.decode("ascii"), thumb
 
 
 class ChatMemoryBot:
     def __init__(self, max_tokens: int = 30000):
-        self.client = OpenAI()
-
-        # Get all models intended for standard completions/chat into MODEL_OPTIONS array
-        global MODEL_OPTIONS
-        models = self.client.models.list()
-        n = 0
-        # Skip anything not intended for standard completions/chat
-        for m in models.data:
-            model_id = m.id
-            if any(skip in model_id for skip in ["embedding", "audio", "search", "realtime", "preview","transcribe", "tts"]):
-                continue
-            if model_id.startswith("gpt-") and not("instruct" in model_id) and (model_id != "gpt-image-1"):
-                MODEL_OPTIONS.append(model_id)
-                n += 1
-        print(f"\n=== {n} Chat Models (use /chat/completions) ===")
-        n = 0
-        MODEL_OPTIONS.sort()
-        for cm in MODEL_OPTIONS: 
-            n +=1
-            print(f"{n}: {cm}")
-        self.default_model = MODEL_OPTIONS[0]
-        self.browse_model = MODEL_OPTIONS[0]
+        self.client = AsyncOpenAI(
+            max_retries=API_MAX_RETRIES,
+            timeout=httpx.Timeout(API_READ_TIMEOUT_S, connect=API_CONNECT_TIMEOUT_S),
+            http_client=_make_http_client(),
+        )
+        self.default_model = ""
+        self.browse_model = ""
         self.max_tokens = max_tokens
-        self.str_system_prompt = "You are a helpfull assistant"
+        self.str_system_prompt = DEFAULT_SYSTEM_PROMPT
 
-        # tiktoken mapping with a safe fallback for new model names
-        try:
-            self.encoder = tiktoken.encoding_for_model(self.browse_model)
-        except KeyError:
-            print("EXCEPTION")
-            prefers_long_ctx = any(s in self.browse_model for s in ("gpt-5", "4.1", "4o", "o4", "o3", "200k"))
-            encoding_name = "o200k_base" if prefers_long_ctx else "cl100k_base"
-            self.encoder = tiktoken.get_encoding(encoding_name)
+        self.chat_history: List[Dict[str, Any]] = [{"role": "system", "content": self.str_system_prompt}]
+        if DEBUG_LOG_HISTORY:
+            print(f"System prompt:\n{self.chat_history}")
+
+        # Provider-reported size of the history after the last reply (see _record_usage)
+        self._usage_tokens: Optional[int] = None
+        self._usage_anchor: Optional[Dict[str, Any]] = None  # assistant message the usage figure ends with
+        self._usage_system: Any = None  # system prompt content the usage figure was measured with
 
-        self.chat_history: List[Dict[str, str]] = [{"role": "system", "content": self.str_system_prompt}]
-        print(f"System prompt:\n{self.chat_history}")
+
+    async def load_models(self) -> None:
+        """
+        Fetch the chat-capable models, pick the first as default and load its tokenizer.
+        Must complete before the first ask().
+        """
+        # Get all models intended for standard completions/chat into MODEL_OPTIONS array.
+        # MODEL_OPTIONS doubles as the process-wide cache, so later bots skip the network call.
+        if not MODEL_OPTIONS:
+            models = await self.client.models.list()
+            # Skip anything not intended for standard completions/chat
+            MODEL_OPTIONS[:] = sorted(
+                m.id for m in models.data
+                if m.id.startswith("gpt-")
+                and "instruct" not in m.id
+                and m.id != "gpt-image-1"
+                and not MODEL_SKIP_REGEX.search(m.id)
+            )
+            print(f"\n=== {len(MODEL_OPTIONS)} Chat Models (use /chat/completions) ===")
+            for n, cm in enumerate(MODEL_OPTIONS, 1):
+                print(f"{n}: {cm}")
+        self.default_model = MODEL_OPTIONS[0]
+        self.browse_model = MODEL_OPTIONS[0]
+        self.encoder = _get_encoder(self.browse_model)
+        self._message_tokens(self.chat_history[0])  # prime the system message count while idle
 
 
     def reset(self, system_prompt: Optional[str] = None) -> None:
@@ -148,13 +363,19 @@ class ChatMemoryBot:
 
 
 
+    def export_history(self) -> List[Dict[str, Any]]:
+        """Return a copy of chat_history without internal cache keys (e.g. "_tok", "_api"), for saving."""
+        return [{k: v for k, v in msg.items() if not k.startswith("_")} for msg in self.chat_history]
+
+
+
     def _content_to_text(self, content: Any, include_placeholders: bool = False) -> str:
         """
         Extract only the textual parts of a message content payload.
         When include_placeholders is True, image parts contribute a short placeholder
         so token counting/logging stays lightweight.
         """
-        if isinstance(content, str):
+        if type(content) is str:  # plain-text messages are the common case
             return content
         if isinstance(content, list):
             parts: List[str] = []
@@ -163,12 +384,14 @@ class ChatMemoryBot:
                 if not isinstance(part, dict):
                     continue
                 p_type = part.get("type", "")
-                if p_type in ("text", "input_text", "output_text"):
-                    parts.append(part.get("text", ""))
-                elif include_placeholders and p_type in ("image_url", "input_image") and not image_added:
+                if p_type in TEXT_PART_TYPES:
+                    text = part.get("text", "")
+                    if text:
+                        parts.append(text)
+                elif include_placeholders and p_type in IMAGE_PART_TYPES and not image_added:
                     parts.append("[image attached]")
                     image_added = True
-            return " ".join(p for p in parts if p)
+            return " ".join(parts)
         return ""
 
 
@@ -180,9 +403,16 @@ class ChatMemoryBot:
         """
         Convert chat_history entries into the structured format expected by the
         Responses API, optionally omitting image payloads (for summaries).
+        Each converted entry is cached on its message (like "_tok"), so only new
+        messages are converted on later turns.
         """
+        cache_key = "_api" if include_images else "_api_text"
         normalized: List[Dict[str, Any]] = []
         for msg in messages:
+            cached = msg.get(cache_key)
+            if cached is not None:
+                normalized.append(cached)
+                continue
             role = msg.get("role", "user")
             raw_content = msg.get("content", "")
             parts: List[Dict[str, Any]] = []
@@ -196,9 +426,9 @@ class ChatMemoryBot:
                     if not isinstance(part, dict):
                         continue
                     p_type = part.get("type")
-                    if p_type in ("text", "input_text", "output_text"):
+                    if p_type in TEXT_PART_TYPES:
                         parts.append({"type": text_type, "text": part.get("text", "")})
-                    elif p_type in ("image_url", "input_image"):
+                    elif p_type in IMAGE_PART_TYPES:
                         image_val = part.get("image_url")
                         if include_images and image_val:
                             # Allow either direct string or {"url": ...} shapes.
@@ -211,83 +441,208 @@ class ChatMemoryBot:
             if not parts:
                 parts.append({"type": text_type, "text": str(raw_content)})
 
-            normalized.append({"role": role, "content": parts})
+            entry: Dict[str, Any] = {"role": role, "content": parts}
+            msg[cache_key] = entry
+            normalized.append(entry)
         return normalized
 
 
+    def _message_tokens(self, msg: Dict[str, Any]) -> int:
+        """
+        Return the token count for a single message, caching it on the dict under "_tok".
+        Message content is never edited in place, so the cached count stays valid.
+        """
+        cached = msg.get("_tok")
+        if cached is None:
+            text = self._content_to_text(msg.get("content", ""), include_placeholders=True)
+            cached = msg["_tok"] = len(self.encoder.encode_ordinary(text))
+        return cached
+
+
     def _count_tokens(self, messages: List[Dict[str, Any]]) -> int:
-        return sum(len(self.encoder.encode(self._content_to_text(msg.get("content", ""), include_placeholders=True))) for msg in messages)
+        # Encode every uncached message in one batch call rather than one encode() per message.
+        # The "ordinary" variants skip special-token checks, so text such as "<|endoftext|>" in
+        # a message is counted as plain text instead of raising ValueError.
+        pending = [msg for msg in messages if msg.get("_tok") is None]
+        if pending:
+            texts = [self._content_to_text(msg.get("content", ""), include_placeholders=True) for msg in pending]
+            for msg, ids in zip(pending, self.encoder.encode_ordinary_batch(texts, num_threads=TOKEN_BATCH_THREADS)):
+                msg["_tok"] = len(ids)
+        return sum(msg["_tok"] for msg in messages)  # every message is cached by now
+
+
+    def _record_usage(self, resp: Any) -> None:
+        """
+        Remember the API-reported input tokens plus the reply's own count so the next turn
+        can reuse them instead of summing the whole history locally. output_tokens is not
+        used: it includes reasoning tokens, which are never sent back. Responses that ran
+        web_search are skipped because their input_tokens include the fetched search content.
+        Call after the reply has been appended to chat_history.
+        """
+        usage = getattr(resp, "usage", None)
+        input_tokens = getattr(usage, "input_tokens", None)
+        cached_tokens = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", None)
+        if input_tokens is not None and cached_tokens is not None:
+            # Server-side prompt caching reuses the unchanged prefix (system prompt first)
+            print(f"[Tokens] Prompt cache: {cached_tokens}/{input_tokens} input tokens cached")
+        used_tools = any(getattr(item, "type", "") == "web_search_call" for item in (getattr(resp, "output", None) or []))
+        if input_tokens is None or used_tools:
+            self._usage_tokens = None
+            return
+        self._usage_tokens = int(input_tokens) + self._message_tokens(self.chat_history[-1])
+        self._usage_anchor = self.chat_history[-1]
+        self._usage_system = self.chat_history[0].get("content")
 
 
-    def _summarize_history(self, old_messages: List[Dict[str, Any]]) -> str:
+    def _history_tokens(self) -> int:
+        """
+        Token count for chat_history. Uses the last provider-reported figure plus the new
+        user message when history is otherwise unchanged since that reply; else counts locally.
+        """
+        hist = self.chat_history
+        if (
+            self._usage_tokens is not None
+            and len(hist) >= 2
+            and hist[-2] is self._usage_anchor
+            and hist[0].get("content") == self._usage_system
+        ):
+            return self._usage_tokens + self._message_tokens(hist[-1])
+        return self._count_tokens(hist)
+
+
+    async def _summarize_history(self, old_messages: List[Dict[str, Any]], prior_summary: str = "") -> str:
         """
         Use the DEFAULT (non-browsing) model for summaries to avoid any tool usage.
         Images are stripped to placeholders so we do not inflate the prompt.
+        When prior_summary is given, only the new messages are sent and the model
+        folds them into that running summary.
         """
+        if prior_summary:
+            instructions = (
+                "Update the running summary of an ongoing chat with the new messages that follow. "
+                "Return the full updated summary in ~500 words, neutral tone.\n\n"
+                f"Running summary so far:\n{prior_summary}"
+            )
+        else:
+            instructions = "Summarize the following chat history in ~500 words, neutral tone."
         summary_prompt: List[Dict[str, Any]] = [
-            {"role": "system", "content": [{"type": "input_text", "text": "Summarize the following chat history in ~500 words, neutral tone."}]}
+            {"role": "system", "content": [{"type": "input_text", "text": instructions}]}
         ] + self._normalize_messages_for_api(old_messages, include_images=False)
 
-        resp = self.client.responses.create(
+        resp = await self.client.responses.create(
             model=self.default_model,  # default model; no tools
             input=summary_prompt, # type: ignore
         )
         return getattr(resp, "output_text", "") or ""
 
 
-    def _trim_history_if_needed(self):
-        token_count = self._count_tokens(self.chat_history)
+    async def _trim_history_if_needed(self):
+        token_count = self._history_tokens()
         print(f"\nTOKEN COUNT = {token_count}")
 
         if token_count > self.max_tokens:
-            system_msg = self.chat_history[0]
-            old_messages = self.chat_history[1:-10]
-            recent_messages = self.chat_history[-10:]
+            cut = len(self.chat_history) - 10  # keep the system message and the last 10 messages
+            old_messages = self.chat_history[1:cut]
+
+            # A summary from an earlier trim sits right after the system message;
+            # carry it forward as text and only summarize what came after it.
+            prior_summary = ""
+            has_summary = False  # the summary text may be empty, so track the message itself
+            if old_messages:
+                first = old_messages[0]
+                first_content = first.get("content")
+                if first.get("role") == "assistant" and isinstance(first_content, str) and first_content.startswith(SUMMARY_PREFIX):
+                    prior_summary = first_content[len(SUMMARY_PREFIX):]
+                    has_summary = True
+                    old_messages = old_messages[1:]
+            if not old_messages:
+                return  # nothing new to fold into the summary
+
+            # token_count may be the provider's figure, which also covers images and message
+            # framing; scale the local per-message counts to it so both sides use one measure.
+            local_total = self._count_tokens(self.chat_history)
+            scale = token_count / local_total if local_total else 1.0
+
+            # If the span to fold is small next to the budget, the overflow comes from the recent
+            # turns (e.g. a pasted log) and a summary would barely help: drop the oldest messages
+            # until under budget instead of paying for another LLM round-trip.
+            if self._count_tokens(old_messages) * scale < SUMMARY_MIN_SHARE * self.max_tokens:
+                start = 2 if has_summary else 1
+                dropped = 0
+                while dropped < len(old_messages) and token_count > self.max_tokens:
+                    token_count -= self._message_tokens(old_messages[dropped]) * scale
+                    dropped += 1
+                print(f"\nTRIMMING HISTORY: dropped {dropped} oldest messages (too small to summarize)")
+                del self.chat_history[start:start + dropped]
+                return
+
             print(f"\nTRIMMING HISTORY: {len(old_messages)} messages summarized to 1 message")
 
-            summary = self._summarize_history(old_messages)
+            summary = await self._summarize_history(old_messages, prior_summary)
             print(f"\nSUMMARY START:\n{summary}\nSUMMARY END***")
             print(f"\nSUMMARY LENGTH (chars): {len(summary)}\n")
 
-            # this is the new trimmed chat history
-            self.chat_history = [
-                system_msg,
-                {"role": "assistant", "content": f"Summary of earlier conversation: {summary}"}
-            ] + recent_messages
+            # this is the new trimmed chat history: swap the summarized span for the summary, in place
+            summary_msg: Dict[str, Any] = {"role": "assistant", "content": f"{SUMMARY_PREFIX}{summary}"}
+            self._message_tokens(summary_msg)
+            self.chat_history[1:cut] = [summary_msg]
 
 
     # --- Robust citation extraction ---
     def _extract_citations(self, resp: Any, reply_text: str) -> List[str]:
         urls: List[str] = []
 
-        # 1) Walk the structured response to find URL-like fields
-        def walk(obj: Any):
-            if isinstance(obj, dict):
-                for k, v in obj.items(): # type: ignore
-                    if k.lower() in ("url", "source", "href") and isinstance(v, str) and v.startswith(("http://", "https://")): # type: ignore
-                        urls.append(v.strip())
-                    walk(v)
-            elif isinstance(obj, list):
-                for it in obj: # type: ignore
-                    walk(it)
-            # primitives ignored
-
+        # 0) Fast path: url_citation annotations on output message parts (Responses API shape)
         try:
-            raw = json.loads(json.dumps(resp, default=lambda o: getattr(o, "__dict__", str(o))))
-            walk(raw)
+            for item in getattr(resp, "output", None) or ():
+                for part in getattr(item, "content", None) or ():
+                    for ann in getattr(part, "annotations", None) or ():
+                        url = getattr(ann, "url", None)
+                        if getattr(ann, "type", "") == "url_citation" and isinstance(url, str):
+                            urls.append(url.strip())
+        except TypeError:
+            urls = []  # unexpected shape; let the generic walk handle it
+        if urls:
+            return _dedupe_preserve_order(urls)
+
+        # 1) Walk the structured response (SDK objects, dicts, lists) to find URL-like fields.
+        # Iterative pre-order traversal; children are pushed reversed to keep document order.
+        # Containers are visited once by id(), so shared or cyclic references cannot loop forever.
+        stack: List[Tuple[Any, Any]] = [(None, resp)]
+        seen_ids: set[int] = set()
+        try:
+            while stack:
+                key, obj = stack.pop()
+                t = type(obj)
+                if t is str:
+                    if type(key) is str and key.lower() in CITATION_URL_KEYS and obj.startswith(URL_SCHEMES):
+                        urls.append(obj.strip())
+                    continue
+                if t in CITATION_LEAF_TYPES:
+                    continue  # numbers/None/flags: skip the seen-set bookkeeping
+                if id(obj) in seen_ids:
+                    continue
+                seen_ids.add(id(obj))
+                # Exact-type checks short-circuit the common case; isinstance catches subclasses
+                if t is dict or isinstance(obj, dict):
+                    children = list(obj.items()) # type: ignore
+                elif t is list or t is tuple or isinstance(obj, (list, tuple)):
+                    children = [(None, it) for it in obj] # type: ignore
+                elif hasattr(obj, "__dict__"):
+                    children = list(vars(obj).items())
+                else:
+                    continue  # primitives ignored
+                stack.extend(reversed(children))
         except Exception as e:
             print(f"[Citations] Structured parse fallback due to: {type(e).__name__}: {e}")
 
-        # 2) Fallback: URLs present in the final text
-        urls += URL_REGEX.findall(reply_text or "")
-
-        # Clean + de-dupe
-        cleaned = []
-        for u in urls:
-            u = u.rstrip(").,;:]").lstrip("([")
-            cleaned.append(u) # type: ignore
+        # Structured citations (e.g. web_search url_citation annotations) are authoritative
+        if urls:
+            return _dedupe_preserve_order(urls)
 
-        return _dedupe_preserve_order(cleaned) # type: ignore
+        # 2) Fallback: URLs present in the final text (already trimmed by URL_REGEX),
+        # streamed from finditer straight into the de-dupe without an intermediate list
+        return _dedupe_preserve_order(m.group(0) for m in URL_REGEX.finditer(reply_text or ""))
 
 
     def _build_request(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -302,7 +657,7 @@ class ChatMemoryBot:
             return {
                 "model": self.browse_model,
                 "input": messages,
-                "tools": [{"type": "web_search"}],
+                "tools": WEB_SEARCH_TOOLS,
                 "tool_choice": "auto",
             }
         else:
@@ -313,14 +668,40 @@ class ChatMemoryBot:
             }
 
 
-    def ask(self, user_input: str, attachments: Optional[List[Dict[str, str]]] = None) -> Tuple[str, List[str]]:
+    async def _stream_response(self, request_kwargs: Dict[str, Any], on_delta: Optional[Callable[[str], None]]) -> Any:
+        """
+        Stream a Responses API call, forwarding output text deltas to on_delta,
+        and return the final response object (same shape as responses.create).
+        """
+        async with self.client.responses.stream(**request_kwargs) as stream: # type: ignore
+            async for event in stream:
+                if on_delta is not None and event.type == "response.output_text.delta":
+                    on_delta(event.delta)
+            return await stream.get_final_response()
+
+
+    async def ask(
+        self,
+        user_input: str,
+        attachments: Optional[List[Dict[str, str]]] = None,
+        system_prompt: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[str, List[str]]:
+        """
+        Send one user turn and return (reply, sources).
+        system_prompt is the editor text, read by the UI on the Tk thread before scheduling this coroutine.
+        on_delta, if given, is called (on the event-loop thread) with each streamed text chunk.
+        """
         print("\nASKING AI")
 
         # Obtain the system prompt string and create the message
-        #global str_system_prompt
-        self.str_system_prompt = app.txt.get("1.0", tk.END).strip()  # Get the system prompt from the text area
-        self.chat_history[0] = {"role": "system", "content": self.str_system_prompt} # type: ignore
-        print(f"System prompt:\n{self._content_to_text(self.chat_history[0].get('content', ''), include_placeholders=True)}")
+        if system_prompt is not None:
+            self.str_system_prompt = system_prompt
+        if self.chat_history[0].get("content") != self.str_system_prompt:
+            # Only replace the message when the prompt changed, so its cached token count survives
+            self.chat_history[0] = {"role": "system", "content": self.str_system_prompt} # type: ignore
+        if DEBUG_LOG_HISTORY:
+            print(f"System prompt:\n{self.str_system_prompt}")
 
         # Build the user message with optional images
         content_parts: List[Dict[str, Any]] = []
@@ -337,25 +718,34 @@ class ChatMemoryBot:
         else:
             # Fallback to plain text slot to keep schema valid
             self.chat_history.append({"role": "user", "content": user_input})
+        self._message_tokens(self.chat_history[-1])
 
-        self._trim_history_if_needed()
+        await self._trim_history_if_needed()
 
         normalized_history = self._normalize_messages_for_api(self.chat_history, include_images=True)
         request_kwargs: Dict[str, Any] = self._build_request(normalized_history)
 
-        # Primary attempt
+        # Primary attempt; remember whether any text reached the transcript
+        streamed = False
+        def _on_delta(delta: str) -> None:
+            nonlocal streamed
+            streamed = True
+            if on_delta is not None:
+                on_delta(delta)
+
         try:
-            resp = self.client.responses.create(**request_kwargs) # type: ignore
+            resp = await self._stream_response(request_kwargs, _on_delta)
         except Exception as e:
-            # Graceful fallback if the error suggests tools/model incompatibility
+            # Graceful fallback if the error suggests tools/model incompatibility. Only retry
+            # before any text was streamed, or the partial reply would stay above the retried one.
             msg = str(e)
-            if ("web_search" in msg or "web_search_preview" in msg or "tools" in msg) and "not supported" in msg.lower():
-                print("[Warn] Tool/model mismatch detected. Retrying without tools on default_model.")
+            if not streamed and ("web_search" in msg or "web_search_preview" in msg or "tools" in msg) and "not supported" in msg.lower():
+                logger.warning("Tool/model mismatch detected. Retrying without tools on default_model.")
                 fallback_kwargs = { # type: ignore
                     "model": self.default_model,
                     "input": self._normalize_messages_for_api(self.chat_history, include_images=True)
                 }
-                resp = self.client.responses.create(**fallback_kwargs) # type: ignore
+                resp = await self._stream_response(fallback_kwargs, on_delta) # type: ignore
             else:
                 raise  # unrelated error
 
@@ -363,11 +753,17 @@ class ChatMemoryBot:
         sources = self._extract_citations(resp, reply)
 
         self.chat_history.append({"role": "assistant", "content": reply})
+        self._message_tokens(self.chat_history[-1])
+        self._record_usage(resp)
         def _log_line(msg: Any) -> str:
             if isinstance(msg, dict):
                 return f"{msg.get('role', '?')}: {self._content_to_text(msg.get('content', ''), include_placeholders=True)}"
             return str(msg)
-        print("\n".join(f"{idx:02d}: {_log_line(msg)}" for idx, msg in enumerate(self.chat_history, 1)))
+        if DEBUG_LOG_HISTORY:
+            print("\n".join(f"{idx:02d}: {_log_line(msg)}" for idx, msg in enumerate(self.chat_history, 1)))
+        else:
+            # Only the newest message; the full dump grows with every turn
+            print(f"{len(self.chat_history):02d}: {_log_line(self.chat_history[-1])}")
         return reply, sources
 
 
@@ -381,9 +777,19 @@ class ChatbotApp:
         self.base_dir = Path(script_dir) / "system_prompts"  
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self.state_path = Path(script_dir) / STATE_FILE
+        self.models_cache_path = Path(script_dir) / MODELS_CACHE_FILE
         print(f'The system prompts are in {self.base_dir}')
         print(f'The STATE FILE path is {self.state_path}')
 
+        self._state_written: Optional[str] = None  # last JSON written by _persist_state
+        self._persist_job: Optional[str] = None  # pending after() id from _schedule_persist
+        self._listing_cache: Dict[str, Tuple[int, Tuple[str, ...]]] = {}  # suffix -> (dir mtime_ns, names)
+        self._combo_index: Dict[str, int] = {}  # prompt name -> position in cbo_files
+        self._combo_index_chat: Dict[str, int] = {}  # chat name -> position in cbo_filesChat
+
+        # Reuse a recently saved model list so startup can skip the models.list() round-trip
+        self._models_cached = self._load_models_cache()
+
         # Tracks which base filename (stem) is currently loaded in the editor
         self.current_name: str | None = None
         self.current_chat_name: str | None = None
@@ -439,14 +845,27 @@ class ChatbotApp:
         # Intercept window close to persist state
         self.master.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        # sets up the chatbot models global array MODEL_OPTIONS[], among other things
+        # One background event loop runs every OpenAI call (no thread per message)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="OpenAILoop").start()
+
+        # Fetch the chatbot models (global array MODEL_OPTIONS[]) in the background so the
+        # window shows immediately; _on_models_loaded fills the model combobox when they land.
         self.bot = ChatMemoryBot()
+        self._models_future = asyncio.run_coroutine_threadsafe(self.bot.load_models(), self.loop)
+        self._models_ready = False
+        self._pending_model: Optional[str] = None  # saved model to select once the list arrives
         self.last_sources: List[str] = []  # stores sources for the most recent bot message
-        self.pending_images: List[Dict[str, str]] = []  # photos queued for the next user message
+        self.pending_images: List[Dict[str, Any]] = []  # photos queued for the next user message
+        self._image_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="ImageLoad")
+        self._no_photos_label: Optional[tk.Label] = None  # "No photos attached" placeholder, when shown
         self._thumb_cache: List[Any] = []  # keep references to PhotoImage thumbs
-        self.labels = MODEL_OPTIONS
-        self.initial_label = MODEL_OPTIONS[0]
         self.last_bot_reply: str = ""  # raw text of the last assistant message
+        self._reply_pending = False  # True from send_message until _on_bot_reply; blocks a second send
+        self._stream_lock = threading.Lock()  # guards each reply's buffered deltas across the two threads
+        self._pending_transcript: List[str] = []  # text queued for the next transcript flush
+        self._transcript_text: List[str] = []  # everything written to chat_display, as inserted
+        self._transcript_flush_scheduled = False
         self.last_bot_json: Optional[Dict[str, Any]] = None  # parsed JSON from last assistant message
 
 
@@ -455,10 +874,11 @@ class ChatbotApp:
         self.lbl_model = tk.Label(master, text="Model :")
         self.lbl_model.place(x=10, y=PADY+1)
      
-        self.model_var = tk.StringVar(master, value=self.initial_label)
-        self.model_cmb = ttk.Combobox(master, state="readonly", values=self.labels, textvariable=self.model_var)
+        self.model_var = tk.StringVar(master, value=MODELS_LOADING_LABEL)
+        self.model_cmb = ttk.Combobox(master, state="disabled", values=[], textvariable=self.model_var)
         self.model_cmb.place(x=MODEL_CMB_X, y=MODEL_CMB_Y, width=MODEL_CMB_WIDTH, height=MODEL_CMB_HEIGHT)
         self.model_cmb.bind("<<ComboboxSelected>>", lambda event: self.select_model())
+        self._models_future.add_done_callback(lambda f: self.master.after(0, self._on_models_loaded, f))
 
         self.lbl_saveChat = tk.Label(master, text="Save Chat as :")
         self.lbl_saveChat.place(x=MODEL_CMB_X+MODEL_CMB_WIDTH+10, y=PADY+1)
@@ -539,12 +959,12 @@ class ChatbotApp:
         Build the same payload your saveChat_as_clicked() writes,
         suitable for autosave or manual save.
         """
-        model_in_use = self.model_cmb.get() or getattr(self.bot, "browse_model", "")
+        model_in_use = self._current_model()
         browse_enabled = ENABLE_HOSTED_WEB_SEARCH
         system_prompt_name = self.current_name  # may be None
         system_prompt_text = self.txt.get("1.0", tk.END)
-        chat_display_text = self.chat_display.get("1.0", tk.END)
-        chat_history = list(self.bot.chat_history)
+        chat_display_text = self._transcript_plaintext()
+        chat_history = self.bot.export_history()
 
         return {
             "meta": {"version": 1},
@@ -570,8 +990,10 @@ class ChatbotApp:
         transcript   = data.get("chat_display_plaintext", "")
         hist         = data.get("chat_history", [])
 
-        # 2) Model restore if available
-        if saved_model and (saved_model in list(self.model_cmb["values"])):
+        # 2) Model restore if available (deferred until the model list has loaded)
+        if saved_model and not self._models_ready:
+            self._pending_model = saved_model
+        elif saved_model and (saved_model in list(self.model_cmb["values"])):
             self.model_var.set(saved_model)
             self.select_model()  # keeps bot.* models in sync
 
@@ -585,8 +1007,7 @@ class ChatbotApp:
         self.txt.insert(tk.END, sp_text or "")
 
         if sp_name:
-            prompt_names = list(self.cbo_files["values"])
-            if sp_name in prompt_names:
+            if sp_name in self._combo_index:
                 self.var_choice.set(sp_name)
                 self._select_combo_item(sp_name)
                 self.var_filename.set(sp_name)
@@ -598,11 +1019,7 @@ class ChatbotApp:
                 self.current_name = None
 
         # 5) Transcript
-        self.chat_display.configure(state='normal')
-        self.chat_display.delete("1.0", tk.END)
-        self.chat_display.insert(tk.END, transcript or "")
-        self.chat_display.configure(state='disabled')
-        self.chat_display.see(tk.END)
+        self._set_transcript(transcript or "")
 
         # 6) Structured history + bot system prompt
         if isinstance(hist, list) and all(isinstance(m, dict) for m in hist):
@@ -618,26 +1035,41 @@ class ChatbotApp:
     # -----------------------
     # Persist/restore helpers
     # -----------------------
-    def _persist_state(self):
+    def _schedule_persist(self) -> None:
         """
-        Save both the last system prompt filename (if any) and last chat name (if any).
+        Coalesce state saves: multi-step actions (delete, refresh, select, ...) that each
+        ask to persist end up as one write PERSIST_DEBOUNCE_MS after the last request.
         """
+        if self._persist_job is not None:
+            self.master.after_cancel(self._persist_job)
+        self._persist_job = self.master.after(PERSIST_DEBOUNCE_MS, self._flush_persist)
+
+    def _flush_persist(self) -> None:
+        self._persist_job = None
+        self._persist_state()
+
+    def _persist_state(self):
+        """Save the last system prompt filename (if any) and last chat name (if any)."""
         data = {
             "last_file": self.current_name,
             "last_chat": self.current_chat_name,
         }
+        payload = json.dumps(data, separators=(",", ":"))
+        if payload == self._state_written:
+            return  # unchanged since the last write
         try:
-            self.state_path.write_text(json.dumps(data), encoding="utf-8")
+            _atomic_write_bytes(self.state_path, payload.encode("utf-8"))
+            self._state_written = payload
         except Exception:
             pass  # non-fatal
 
-    def _load_state(self) -> Dict[str, Optional[str]]:
+    def _load_state(self) -> Dict[str, Any]:
         """
         Load state file robustly. Returns dict with keys "last_file" and "last_chat".
         Backward compatible with older state that only had last_file.
         """
         try:
-            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            data = json.loads(self.state_path.read_bytes())
             if isinstance(data, dict):
                 return {
                     "last_file": data.get("last_file"),
@@ -647,6 +1079,34 @@ class ChatbotApp:
             pass
         return {"last_file": None, "last_chat": None}
 
+    def _load_models_cache(self) -> bool:
+        """
+        Fill MODEL_OPTIONS from MODELS_CACHE_FILE when it is younger than MODELS_CACHE_TTL_S.
+        Returns True if the cached list was used.
+        """
+        try:
+            data = json.loads(self.models_cache_path.read_bytes())
+            models = data.get("models")
+            models_ts = data.get("models_ts")
+            if (
+                isinstance(models, list) and models and all(isinstance(m, str) for m in models)
+                and isinstance(models_ts, (int, float)) and time.time() - models_ts < MODELS_CACHE_TTL_S
+            ):
+                MODEL_OPTIONS[:] = models
+                print(f"[Models] Using {len(MODEL_OPTIONS)} cached models from {MODELS_CACHE_FILE}")
+                return True
+        except Exception:
+            pass
+        return False
+
+    def _save_models_cache(self) -> None:
+        """Write the freshly fetched MODEL_OPTIONS and the fetch time to MODELS_CACHE_FILE."""
+        payload = json.dumps({"models": list(MODEL_OPTIONS), "models_ts": time.time()}, separators=(",", ":"))
+        try:
+            _atomic_write_bytes(self.models_cache_path, payload.encode("utf-8"))
+        except Exception:
+            pass  # non-fatal
+
 
     # -----------------------
     # Chat session helpers
@@ -656,27 +1116,25 @@ class ChatbotApp:
         Return a sorted list of saved chat session names (without extension).
         Looks for files named *.chat.json in base_dir.
         """
-        names: list[str] = []
-        for p in self.base_dir.glob("*.chat.json"):
-            # strip the trailing ".chat.json" from the filename
-            fname = p.name
-            if fname.endswith(".chat.json"):
-                names.append(fname[:-10])  # remove .chat.json (10 chars)
-        names.sort()
-        return names
+        return list(self._list_basenames(".chat.json"))
 
 
     def refresh_comboboxChat(self):
         """Populate chat session combobox with the names of saved sessions."""
-        names = self.list_chat_basenames()
+        self._set_chat_names(self.list_chat_basenames())
+
+
+    def _set_chat_names(self, names: List[str]) -> None:
+        """Set the chat combobox values and the name -> position index used for lookups."""
         self.cbo_filesChat["values"] = names
+        self._combo_index_chat = {n: i for i, n in enumerate(names)}
 
 
     def _select_combo_itemChat(self, name: str):
         """Select 'name' in the chat combobox and focus it, if present."""
-        values = list(self.cbo_filesChat["values"])
-        if name in values:
-            self.cbo_filesChat.current(values.index(name))
+        idx = self._combo_index_chat.get(name)
+        if idx is not None:
+            self.cbo_filesChat.current(idx)
         self.cbo_filesChat.focus_set()
 
 
@@ -713,28 +1171,21 @@ class ChatbotApp:
         # --- 3) Reset the bot to a fresh conversation ---------------------------
         self.bot.reset(system_prompt=new_system_prompt)
 
-        # --- 4) Clear the visible chat transcript -------------------------------
-        self.chat_display.configure(state='normal')
-        self.chat_display.delete("1.0", tk.END)
-        self.chat_display.configure(state='disabled')
+        # --- 4) Replace the visible chat transcript with the usual visual cue ---
+        # (one widget edit: clear and insert together)
+        self._set_transcript("- New chat started -\n\n")
 
         # --- 5) Clear last sources and any pending input ------------------------
         self.last_sources = []
         self._clear_input()
         self.clear_attachments()
 
-        # --- 6) Provide the usual visual cue -----------------------------------
-        self.chat_display.configure(state='normal')
-        self.chat_display.insert(tk.END, "- New chat started -\n\n")
-        self.chat_display.configure(state='disabled')
-        self.chat_display.see(tk.END)
-
         # Optional: move typing focus to the input box for immediate chatting
         #self.user_input.focus_set()
         self.ent_nameChat.focus_set()   # instead of self.user_input.focus_set()
 
         # --- 7) Persist lightweight state ---------------------------------------
-        self._persist_state()
+        self._schedule_persist()
 
         print("[UI] New chat started. System prompt in use:")
         print(new_system_prompt)
@@ -772,24 +1223,22 @@ class ChatbotApp:
     # Attachment helpers
     # -----------------------
     @staticmethod
-    def _image_to_data_url(path: str) -> str:
-        mime, _ = mimetypes.guess_type(path)
-        if not mime:
-            mime = "image/png"
-        with open(path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("utf-8")
-        return f"data:{mime};base64,{b64}"
+    def _load_image(path: str) -> Tuple[str, Optional[Any]]:
+        """
+        (data URL, PIL thumbnail) for an image, reading the file only once.
+        Re-attaching an unchanged file reuses the cached result. Runs on the image pool.
+        """
+        st = os.stat(path)
+        return _load_image_file(path, st.st_mtime_ns, st.st_size, THUMB_SIZE)
 
-    def _build_thumbnail(self, path: str, size: int = 36) -> Optional[Any]:
+    def _build_thumbnail(self, pil_thumb: Optional[Any] = None, size: int = THUMB_SIZE) -> Optional[Any]:
         """
-        Create a small thumbnail image for display beside the filename.
-        Uses Pillow if available; otherwise returns a flat placeholder square.
+        Create the Tk thumbnail shown beside the filename (Tk images must be made on the Tk thread).
+        Uses the Pillow thumbnail if one was decoded; otherwise returns a flat placeholder square.
         """
         try:
-            if Image and ImageTk:
-                img = Image.open(path)
-                img.thumbnail((size, size))
-                return ImageTk.PhotoImage(img)
+            if pil_thumb is not None and ImageTk:
+                return ImageTk.PhotoImage(pil_thumb)
         except Exception:
             pass
         try:
@@ -802,28 +1251,48 @@ class ChatbotApp:
 
 
     def _render_attachment_pills(self) -> None:
-        """Refresh the inline chips that show pending photos."""
+        """
+        Rebuild the inline chips that show pending photos from scratch.
+        Adding/removing single photos uses _add_pill/_remove_attachment_item instead.
+        """
         for child in self.attachments_holder.winfo_children():
             child.destroy()
         self._thumb_cache.clear()
+        self._no_photos_label = None
 
         if not self.pending_images:
-            tk.Label(self.attachments_holder, text="No photos attached", anchor="w", fg="#555", bg="#f4f4f4", padx=4).pack(side="left")
-            self.clear_attachments_btn.configure(state="disabled")
+            self._show_no_photos_label()
             return
 
         self.clear_attachments_btn.configure(state="normal")
-        for idx, item in enumerate(self.pending_images):
-            pill = tk.Frame(self.attachments_holder, bg="#e6eaef", bd=1, relief="solid")
-            thumb = item.get("thumb")
-            if thumb is not None:
-                lbl_thumb = tk.Label(pill, image=thumb, bg="#e6eaef")
-                lbl_thumb.image = thumb  # type: ignore # prevent GC
-                lbl_thumb.pack(side="left", padx=(4, 2), pady=1)
-                self._thumb_cache.append(thumb)
-            tk.Label(pill, text=item.get("filename", "photo"), bg="#e6eaef").pack(side="left", padx=(2, 4))
-            tk.Button(pill, text="✕", command=lambda i=idx: self.remove_attachment(i), padx=4, pady=0, bg="#dbe0e8", relief="flat").pack(side="right", padx=(0, 2), pady=1)
-            pill.pack(side="left", padx=4, pady=2)
+        for item in self.pending_images:
+            self._add_pill(item)
+
+
+    def _show_no_photos_label(self) -> None:
+        """Empty-state placeholder for the attachment bar."""
+        self._no_photos_label = tk.Label(self.attachments_holder, text="No photos attached", anchor="w", fg="#555", bg="#f4f4f4", padx=4)
+        self._no_photos_label.pack(side="left")
+        self.clear_attachments_btn.configure(state="disabled")
+
+
+    def _add_pill(self, item: Dict[str, Any]) -> None:
+        """Append one chip for a pending photo; the widgets are kept on the item for later updates."""
+        if self._no_photos_label is not None:
+            self._no_photos_label.destroy()
+            self._no_photos_label = None
+            self.clear_attachments_btn.configure(state="normal")
+        pill = tk.Frame(self.attachments_holder, bg="#e6eaef", bd=1, relief="solid")
+        thumb = item.get("thumb")
+        lbl_thumb = tk.Label(pill, image=thumb, bg="#e6eaef")
+        lbl_thumb.image = thumb  # type: ignore # prevent GC
+        if thumb is not None:
+            lbl_thumb.pack(side="left", padx=(4, 2), pady=1)
+        tk.Label(pill, text=item.get("filename", "photo"), bg="#e6eaef").pack(side="left", padx=(2, 4))
+        tk.Button(pill, text="✕", command=lambda: self._remove_attachment_item(item), padx=4, pady=0, bg="#dbe0e8", relief="flat").pack(side="right", padx=(0, 2), pady=1)
+        pill.pack(side="left", padx=4, pady=2)
+        item["pill"] = pill
+        item["thumb_label"] = lbl_thumb
 
 
     def add_images(self) -> None:
@@ -835,57 +1304,110 @@ class ChatbotApp:
         if not paths:
             return
 
-        added = 0
         for p in paths:
-            try:
-                data_url = self._image_to_data_url(p)
-            except Exception as e:
-                messagebox.showerror("Image error", f"Could not read {p}:\n{e}")
+            if not os.access(p, os.R_OK):
+                messagebox.showerror("Image error", f"Could not read {p}")
                 continue
+            # Read once (data URL + thumbnail) in the background; _ask_when_ready collects the result
+            data_future = self._image_pool.submit(self._load_image, p)
             name = os.path.basename(p)
-            thumb = self._build_thumbnail(p)
-            self.pending_images.append({"filename": name, "data_url": data_url, "thumb": thumb}) # type: ignore
-            added += 1
+            item = {"filename": name, "data_future": data_future, "thumb": self._build_thumbnail()}
+            self.pending_images.append(item)
+            self._add_pill(item)
+            # Swap in the real thumbnail once the background read finishes
+            data_future.add_done_callback(lambda f, item=item: self.master.after(0, self._on_image_loaded, item))
 
-        if added:
-            self._render_attachment_pills()
 
-
-    def remove_attachment(self, index: int) -> None:
-        if 0 <= index < len(self.pending_images):
-            del self.pending_images[index]
-        self._render_attachment_pills()
+    def _on_image_loaded(self, item: Dict[str, Any]) -> None:
+        """
+        Runs on the Tk thread when a photo's background read finishes: shows its thumbnail,
+        or drops the attachment and reports the error. Already-sent photos are left alone.
+        """
+        pending = any(att is item for att in self.pending_images)
+        future = item["data_future"]
+        error = future.exception()
+        if error is not None:
+            if pending:
+                self._remove_attachment_item(item)
+                messagebox.showerror("Image error", f"Could not read {item.get('filename', 'photo')}:\n{error}")
+            return
+        if not pending:
+            return  # sent or removed meanwhile; no chip to show a thumbnail on
+        item["thumb"] = self._build_thumbnail(future.result()[1])
+        lbl_thumb = item.get("thumb_label")
+        if lbl_thumb is not None and item["thumb"] is not None:
+            # Update just this chip's image in place
+            lbl_thumb.configure(image=item["thumb"])
+            lbl_thumb.image = item["thumb"]  # type: ignore # prevent GC
+
+
+    def _remove_attachment_item(self, item: Dict[str, Any]) -> None:
+        """Drop one pending photo and destroy only its chip."""
+        for i, att in enumerate(self.pending_images):
+            if att is item:
+                del self.pending_images[i]
+                break
+        pill = item.pop("pill", None)
+        if pill is not None:
+            pill.destroy()
+        if not self.pending_images and self._no_photos_label is None:
+            self._show_no_photos_label()
 
 
     def clear_attachments(self) -> None:
+        if not self.pending_images and self._no_photos_label is not None:
+            return  # already showing the empty state; nothing to rebuild
         self.pending_images.clear()
         self._render_attachment_pills()
 
 
     def list_txt_basenames(self):
         """Return a sorted list of filenames (without .txt) in base_dir."""
-        return sorted(p.stem for p in self.base_dir.glob("*.txt"))
+        return list(self._list_basenames(".txt"))
+
+
+    def _list_basenames(self, suffix: str) -> Tuple[str, ...]:
+        """
+        Sorted names of the files in base_dir ending in suffix, with the suffix removed.
+        Cached per suffix until base_dir's mtime changes (any file created, renamed or deleted),
+        and cleared after the app's own saves and deletes, since coarse directory timestamps
+        (FAT, some network shares) can miss two changes within one tick.
+        """
+        mtime_ns = os.stat(self.base_dir).st_mtime_ns
+        cached = self._listing_cache.get(suffix)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        # scandir yields names without building a glob pattern or a Path per entry
+        with os.scandir(self.base_dir) as entries:
+            names = tuple(sorted(
+                e.name[:-len(suffix)] for e in entries
+                if e.name.endswith(suffix) and e.is_file()
+            ))
+        self._listing_cache[suffix] = (mtime_ns, names)
+        return names
 
 
     def refresh_combobox(self):
-        names = self.list_txt_basenames()
+        self._set_prompt_names(self.list_txt_basenames())
+
+
+    def _set_prompt_names(self, names: List[str]) -> None:
+        """Set the prompt combobox values and the name -> position index used for lookups."""
         self.cbo_files["values"] = names
+        self._combo_index = {n: i for i, n in enumerate(names)}
 
 
     @staticmethod
     def _sanitize_filename(name: str) -> str:
         """Constrain filename to safe characters."""
-        name = name.strip()
-        name = re.sub(r"[^A-Za-z0-9._ \-]", "_", name)
-        name = re.sub(r"\s+", " ", name)
-        return name
+        return WHITESPACE_REGEX.sub(" ", FILENAME_UNSAFE_REGEX.sub("_", name.strip()))
 
 
     def _select_combo_item(self, name: str):
         """Select 'name' in the combobox and focus it, if present."""
-        values = list(self.cbo_files["values"])
-        if name in values:
-            self.cbo_files.current(values.index(name))
+        idx = self._combo_index.get(name)
+        if idx is not None:
+            self.cbo_files.current(idx)
         self.cbo_files.focus_set()
   
 
@@ -932,6 +1454,7 @@ class ChatbotApp:
         # Delete the file
         try:
             file_to_delete.unlink()  # Delete the file
+            self._listing_cache.clear()
             messagebox.showinfo("File Deleted", f"File {file_to_delete.name} has been deleted.")
         except Exception as e:
             messagebox.showerror("Delete Failed", f"Failed to delete the file: {e}")
@@ -975,6 +1498,7 @@ class ChatbotApp:
         # 3) Delete the file
         try:
             target.unlink()
+            self._listing_cache.clear()
         except Exception as e:
             messagebox.showerror("Delete Failed", f"Failed to delete the chat session:\n{e}")
             return
@@ -991,9 +1515,7 @@ class ChatbotApp:
             self.cbo_filesChat.set("")
 
             # Clear transcript
-            self.chat_display.configure(state='normal')
-            self.chat_display.delete("1.0", tk.END)
-            self.chat_display.configure(state='disabled')
+            self._set_transcript("")
 
             # Clear last sources and pending input
             self.last_sources = []
@@ -1004,7 +1526,7 @@ class ChatbotApp:
             self.bot.reset(system_prompt=current_sp)
 
         # 6) Try to select another existing chat (if any remain)
-        remaining = list(self.cbo_filesChat["values"])
+        remaining = list(self._combo_index_chat)  # names in combobox order
         if remaining:
             # pick the last one alphabetically (or any policy you prefer)
             next_name = remaining[-1]
@@ -1014,7 +1536,7 @@ class ChatbotApp:
             # No remaining chats; just focus the chat list to signal completion
             self.cbo_filesChat.focus_set()
 
-        self._persist_state()
+        self._schedule_persist()
         messagebox.showinfo("Deleted", f"Deleted chat session:\n{target}")
 
 
@@ -1047,16 +1569,16 @@ class ChatbotApp:
                 ):
                     return
             target.write_text(text, encoding="utf-8")
+            self._listing_cache.clear()
         except Exception as e:
             messagebox.showerror("Save failed", f"Could not save file:\n{e}")
             return
 
         # Update combobox list if new
-        current = list(self.cbo_files["values"])
-        if name not in current:
-            current.append(name)
-            current.sort()
-            self.cbo_files["values"] = current
+        if name not in self._combo_index:
+            names = list(self._combo_index)  # already sorted
+            bisect.insort(names, name)
+            self._set_prompt_names(names)
 
         # Mark as the current open file
         self.current_name = name
@@ -1092,7 +1614,7 @@ class ChatbotApp:
 
         # 3) Collect the data we want to persist
         # Current model (both app & bot kept in sync by select_model)
-        model_in_use = self.model_cmb.get() or getattr(self.bot, "browse_model", "")
+        model_in_use = self._current_model()
         # Whether hosted web search is enabled
         browse_enabled = ENABLE_HOSTED_WEB_SEARCH
         # System prompt info (filename + text)
@@ -1100,10 +1622,10 @@ class ChatbotApp:
         system_prompt_text = self.txt.get("1.0", tk.END)
 
         # Visible chat as plaintext
-        chat_display_text = self.chat_display.get("1.0", tk.END)
+        chat_display_text = self._transcript_plaintext()
 
         # Structured chat history from bot
-        chat_history = list(self.bot.chat_history)
+        chat_history = self.bot.export_history()
 
         payload = {
             "meta": {"version": 1},
@@ -1125,25 +1647,25 @@ class ChatbotApp:
                 ):
                     return
 
-            target.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+            _atomic_write_bytes(target, _dumps_json(payload, pretty=True))
+            self._listing_cache.clear()
 
         except Exception as e:
             messagebox.showerror("Save failed", f"Could not save chat session:\n{e}")
             return
 
         # 5) Update the chat combobox if new, then select & focus it
-        current = list(self.cbo_filesChat["values"])
-        if name not in current:
-            current.append(name)
-            current.sort()
-            self.cbo_filesChat["values"] = current
+        if name not in self._combo_index_chat:
+            names = list(self._combo_index_chat)  # already sorted
+            bisect.insort(names, name)
+            self._set_chat_names(names)
 
         self.var_choiceChat.set(name)
         self._select_combo_itemChat(name)
         self.var_filenameChat.set(name)
 
         self.current_chat_name = name
-        self._persist_state()
+        self._schedule_persist()
         messagebox.showinfo("Saved", f"Chat session saved to:\n{target}")
 
 
@@ -1206,7 +1728,7 @@ class ChatbotApp:
 
         # --- C) Load the requested chat -----------------------------------------
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
+            data = _loads_json(path.read_bytes())
         except Exception as e:
             messagebox.showerror("Load failed", f"Invalid chat session file:\n{e}")
             return
@@ -1221,7 +1743,7 @@ class ChatbotApp:
         self.refresh_comboboxChat()  # in case files changed due to pre-save
 
         # Persist the "last_chat" pointer so we restore this on next launch
-        self._persist_state()
+        self._schedule_persist()
 
         # --- E) UX nicety: typing focus into the input field --------------------
         self.user_input.focus_set()
@@ -1237,7 +1759,8 @@ class ChatbotApp:
         payload = self._serialize_current_chat()
         target = (self.base_dir / f"{name}.chat.json")
         # Overwrite without asking – this is an autosave-on-exit of a named chat
-        target.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        _atomic_write_bytes(target, _dumps_json(payload))
+        self._listing_cache.clear()
         return target
 
 
@@ -1247,7 +1770,8 @@ class ChatbotApp:
         """
         payload = self._serialize_current_chat()
         autosave_path = self.base_dir / CHAT_AUTOSAVE_FILE
-        autosave_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        _atomic_write_bytes(autosave_path, _dumps_json(payload))
+        self._listing_cache.clear()
         return autosave_path
 
 
@@ -1281,7 +1805,7 @@ class ChatbotApp:
             path = self.base_dir / f"{last_chat}.chat.json"
             if path.exists():
                 try:
-                    data = json.loads(path.read_text(encoding="utf-8"))
+                    data = _loads_json(path.read_bytes())
                     self._apply_chat_payload(data)
                     self.current_chat_name = last_chat
                     self.var_filenameChat.set(last_chat)
@@ -1296,7 +1820,7 @@ class ChatbotApp:
         autosave_path = self.base_dir / CHAT_AUTOSAVE_FILE
         if autosave_path.exists():
             try:
-                data = json.loads(autosave_path.read_text(encoding="utf-8"))
+                data = _loads_json(autosave_path.read_bytes())
                 self._apply_chat_payload(data)
                 # Do not set current_chat_name here (autosave is unnamed by design)
                 self.var_filenameChat.set("")
@@ -1328,29 +1852,51 @@ class ChatbotApp:
                     print(f"[Exit Save] Failed to save named chat '{self.current_chat_name}': {e}")
                     # As a safety net, also write an autosave so nothing is lost
                     try:
-                        autosave_path = self.base_dir / CHAT_AUTOSAVE_FILE
-                        autosave_path.write_text(
-                            json.dumps(self._serialize_current_chat(), ensure_ascii=False, indent=2),
-                            encoding="utf-8"
-                        )
+                        self._write_autosave()
                     except Exception as e2:
                         print(f"[Autosave Fallback] Failed: {e2}")
             else:
                 # Unnamed chat: autosave
                 try:
-                    autosave_path = self.base_dir / CHAT_AUTOSAVE_FILE
-                    autosave_path.write_text(
-                        json.dumps(self._serialize_current_chat(), ensure_ascii=False, indent=2),
-                        encoding="utf-8"
-                    )
+                    self._write_autosave()
                 except Exception as e:
                     print(f"[Autosave] Failed: {e}")
         finally:
-            # Persist lightweight state no matter what
+            # Persist lightweight state no matter what (synchronously; drops any pending debounce)
+            if self._persist_job is not None:
+                self.master.after_cancel(self._persist_job)
+                self._persist_job = None
             self._persist_state()
             self.master.destroy()
 
 
+    def _on_models_loaded(self, future: "concurrent.futures.Future[None]") -> None:
+        """Runs on the Tk thread once bot.load_models() finishes; fills and enables the model combobox."""
+        try:
+            future.result()
+        except Exception as e:
+            self.model_var.set("(models unavailable)")
+            messagebox.showerror("Model list failed", f"Could not fetch the model list:\n{type(e).__name__}: {e}")
+            return
+        self.model_cmb.configure(values=MODEL_OPTIONS, state="readonly")
+        self._models_ready = True
+        if not self._models_cached:
+            # Freshly fetched from the API: save it for the next launch
+            self._models_cached = True
+            self._save_models_cache()
+        chosen = self._pending_model if self._pending_model in MODEL_OPTIONS else MODEL_OPTIONS[0]
+        self._pending_model = None
+        self.model_var.set(chosen)
+        self.select_model()
+
+
+    def _current_model(self) -> str:
+        """Model name to record in saved chats (the pending one while the list is still loading)."""
+        if not self._models_ready:
+            return self._pending_model or getattr(self.bot, "browse_model", "")
+        return self.model_cmb.get() or getattr(self.bot, "browse_model", "")
+
+
     def select_model(self):
         """
         Update the bot's model based on the selected value in the combobox.
@@ -1363,10 +1909,13 @@ class ChatbotApp:
         self.bot.browse_model = chosen # For simplicity, use the same model for browsing
         print(f"Model changed to: {chosen}")
 
-    def _format_user_display(self, text: str, attachments: List[Dict[str, str]]) -> str:
+    def _format_user_display(self, text: str, attachments: List[Dict[str, Any]]) -> str:
         """Compose the transcript text shown for a user message."""
         if attachments:
-            names = ", ".join(img.get("filename", "photo") for img in attachments)
+            if len(attachments) == 1:
+                names = attachments[0].get("filename", "photo")
+            else:
+                names = ", ".join([img.get("filename", "photo") for img in attachments])
             if text:
                 return f"{text}\n[Photos: {names}]"
             return f"[Photos: {names}]"
@@ -1391,6 +1940,8 @@ class ChatbotApp:
         return "break"
 
     def send_message(self, _: Optional[Any] = None) -> None:
+        if self._reply_pending:
+            return  # one turn at a time; the typed text stays in the box until the reply is done
         user_text = self._get_input_text()
         attachments = list(self.pending_images)
         if not user_text and not attachments:
@@ -1399,40 +1950,141 @@ class ChatbotApp:
         self.display_message("You", self._format_user_display(user_text, attachments))
         self._clear_input()
         self.clear_attachments()
-        threading.Thread(target=self.get_bot_response, args=(user_text, attachments), daemon=True).start()
+        system_prompt = self.txt.get("1.0", tk.END).strip()  # read on the Tk thread
+        self._reply_pending = True
+        # Per-reply stream state: "open" once the 'Bot:' line is written, "deltas" not yet drained
+        stream: Dict[str, Any] = {"open": False, "deltas": []}
+        on_delta = lambda delta: self._queue_stream_delta(stream, delta)
+        future = asyncio.run_coroutine_threadsafe(self._ask_when_ready(user_text, attachments, system_prompt, on_delta), self.loop)
+        future.add_done_callback(lambda f: self.master.after(0, self._on_bot_reply, f, stream))
+
 
+    async def _ask_when_ready(
+        self,
+        user_text: str,
+        attachments: List[Dict[str, Any]],
+        system_prompt: str,
+        on_delta: Callable[[str], None],
+    ) -> Tuple[str, List[str]]:
+        """
+        Runs on the event loop: wait for the model list (if still loading) and for any
+        photos still being encoded, then bot.ask().
+        """
+        await asyncio.wrap_future(self._models_future)
+        images = [
+            {"filename": att.get("filename", "photo"), "data_url": (await asyncio.wrap_future(att["data_future"]))[0]}
+            for att in attachments
+        ]
+        return await self.bot.ask(user_text, images, system_prompt, on_delta)
 
-    def get_bot_response(self, user_text: str, attachments: List[Dict[str, str]]):
+
+    def _queue_stream_delta(self, stream: Dict[str, Any], delta: str) -> None:
+        """
+        Runs on the event loop for each streamed chunk. Chunks are buffered and only the
+        first one since the last drain schedules a Tk callback, so a fast stream costs one
+        cross-thread after() per batch rather than per token.
+        """
+        with self._stream_lock:
+            first = not stream["deltas"]
+            stream["deltas"].append(delta)
+        if first:
+            self.master.after(0, self._drain_stream_deltas, stream)
+
+
+    def _drain_stream_deltas(self, stream: Dict[str, Any]) -> None:
+        """Tk thread: hand every buffered chunk to the transcript as one append."""
+        with self._stream_lock:
+            deltas, stream["deltas"] = stream["deltas"], []
+        if deltas:
+            self._append_stream_delta(stream, "".join(deltas))
+
+
+    def _append_stream_delta(self, stream: Dict[str, Any], delta: str) -> None:
+        """Append a streamed chunk of the bot reply, opening the 'Bot:' line on the first chunk."""
+        if not stream["open"]:
+            delta = f"Bot: {delta}"
+            stream["open"] = True
+        self._append_transcript(delta)
+
+
+    def _on_bot_reply(self, future: "concurrent.futures.Future[Tuple[str, List[str]]]", stream: Dict[str, Any]) -> None:
+        """Runs on the Tk thread once bot.ask() finishes; shows the reply or the error."""
+        self._reply_pending = False
+        self._drain_stream_deltas(stream)  # any chunks still buffered belong before the closing text
         try:
-            reply, sources = self.bot.ask(user_text, attachments)
+            reply, sources = future.result()
             self.last_sources = sources or []
         except Exception as e:
             reply = f"[Error] {type(e).__name__}: {e}"
             self.last_sources = []
         self.last_bot_reply = reply
         self.last_bot_json = self._find_first_json_object(reply)
-        self.display_message("Bot", reply)
+        if stream["open"]:
+            # Reply text is already on screen; just close the block (plus any error that cut it short)
+            stream["open"] = False
+            self._append_transcript("\n\n" if future.exception() is None else f"\n{reply}\n\n")
+        else:
+            self.display_message("Bot", reply)
 
 
     def display_message(self, sender: str, message: str) -> None:
+        self._append_transcript(f"{sender}: {message}\n\n")
+
+
+    def _append_transcript(self, text: str) -> None:
+        """
+        Queue raw text for the read-only transcript. Writes arriving within
+        TRANSCRIPT_FLUSH_MS of each other (e.g. streamed deltas) are flushed together.
+        """
+        self._pending_transcript.append(text)
+        if not self._transcript_flush_scheduled:
+            self._transcript_flush_scheduled = True
+            self.master.after(TRANSCRIPT_FLUSH_MS, self._flush_transcript)
+
+
+    def _flush_transcript(self) -> None:
+        """Write all queued transcript text with a single insert and scroll to it."""
+        self._transcript_flush_scheduled = False
+        if not self._pending_transcript:
+            return
+        text = "".join(self._pending_transcript)
+        self._pending_transcript.clear()
+        self._transcript_text.append(text)
         self.chat_display.configure(state='normal')
-        self.chat_display.insert(tk.END, f"{sender}: {message}\n\n")
+        self.chat_display.insert(tk.END, text)
         self.chat_display.configure(state='disabled')
         self.chat_display.see(tk.END)
 
 
-    def show_sources(self) -> None:
+    def _set_transcript(self, text: str) -> None:
+        """Replace the whole transcript (new/loaded/deleted chat), dropping anything still queued."""
+        self._pending_transcript.clear()
+        self._transcript_text[:] = [text]
         self.chat_display.configure(state='normal')
-        if not self.last_sources:
-            self.chat_display.insert(tk.END, "Sources: (none detected)\n\n")
-        else:
-            self.chat_display.insert(tk.END, "Sources:\n")
-            for i, src in enumerate(self.last_sources, 1):
-                self.chat_display.insert(tk.END, f"  {i}. {src}\n")
-            self.chat_display.insert(tk.END, "\n")
+        self.chat_display.delete("1.0", tk.END)
+        self.chat_display.insert(tk.END, text)
         self.chat_display.configure(state='disabled')
         self.chat_display.see(tk.END)
 
+
+    def _transcript_plaintext(self) -> str:
+        """
+        Transcript text for saving, from the Python-side mirror rather than a full widget get().
+        Ends with the newline Tk's get("1.0", END) appends, so saved files keep their format.
+        """
+        self._flush_transcript()
+        text = "".join(self._transcript_text)
+        self._transcript_text[:] = [text]  # keep the mirror as a single string
+        return text + "\n"
+
+
+    def show_sources(self) -> None:
+        if not self.last_sources:
+            self._append_transcript("Sources: (none detected)\n\n")
+        else:
+            lines = "".join([f"  {i}. {src}\n" for i, src in enumerate(self.last_sources, 1)])
+            self._append_transcript(f"Sources:\n{lines}\n")
+
     # -----------------------
     # NIP / foods.db helpers
     # -----------------------
@@ -1570,7 +2222,7 @@ class ChatbotApp:
         # Prefer the cached last reply; fall back to the whole transcript
         source_text = self.last_bot_reply or ""
         if not source_text:
-            source_text = self.chat_display.get("1.0", tk.END)
+            source_text = self._transcript_plaintext()
 
         nip_obj = self.last_bot_json or self._find_first_json_object(source_text)
         if not nip_obj:
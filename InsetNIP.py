@@ -1,6 +1,12 @@
 import json
 import sqlite3
 from pathlib import Path
+from typing import Iterable, List, Optional
+try:
+    import orjson  # optional; faster parsing of large pasted batches
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import scrolledtext
@@ -15,6 +21,10 @@ DB_PATH = Path(
     #r"C:\Users\roman\AppData\Local\Apps\2.0\47YPNLYJ.7QW\WVEC47TY.EC3\diet..tion_0000000000000000_0002.0000_39270b5535d9b46c\foods.db"
 )
 
+# WAL journal + synchronous=NORMAL: fewer fsyncs per commit. Off by default because
+# journal_mode=WAL is stored in foods.db itself, which the diet application also opens.
+DB_USE_WAL = False
+
 # Columns to insert (FoodId is autoincrement, so we omit it)
 COLUMNS = [
     "FoodDescription",
@@ -46,55 +56,88 @@ COLUMNS = [
 # Extra keys that should be silently ignored (e.g. notes at the end)
 IGNORED_EXTRA_KEYS = {"notes", "Notes"}
 
+# The INSERT statement never changes, so build it once
+INSERT_SQL = (
+    f"INSERT INTO Foods ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join(['?'] * len(COLUMNS))})"
+)
+
 
 # -------------------------
 # Database helper
 # -------------------------
 
-def insert_food_record(json_data: dict) -> int:
+def _desc(val) -> str:
+    """FoodDescription: allow None and treat it as an empty string."""
+    return "" if val is None else str(val)
+
+
+def _num(val) -> float:
     """
-    Insert a single food record into the Foods table.
-    json_data must be a dict with keys exactly matching COLUMNS.
-    Behaviour:
-      - FoodDescription: if null -> empty string.
-      - Any numeric field: if null or "null" -> 0.0
-    Returns the auto-generated FoodId.
+    Numeric fields:
+      - JSON null -> Python None -> 0.0
+      - string "null" (case-insensitive) -> 0.0
     """
-    # Build the SQL INSERT statement dynamically
-    column_list = ", ".join(COLUMNS)
-    placeholders = ", ".join(["?"] * len(COLUMNS))
-    sql = f"INSERT INTO Foods ({column_list}) VALUES ({placeholders})"
-
-    values = []
-    for col in COLUMNS:
-        val = json_data.get(col, None)
-
-        if col == "FoodDescription":
-            # For description, allow None and treat as empty string
-            if val is None:
-                val = ""
-            values.append(str(val))
-        else:
-            # For all numeric fields:
-            # - If JSON has null -> Python None -> treat as 0.0
-            # - If JSON has string "null" (case-insensitive) -> treat as 0.0
-            if val is None:
-                numeric_val = 0.0
-            elif isinstance(val, str) and val.strip().lower() == "null":
-                numeric_val = 0.0
-            else:
-                numeric_val = float(val)
-
-            values.append(numeric_val)
+    if val is None:
+        return 0.0
+    if isinstance(val, str) and val.strip().lower() == "null":
+        return 0.0
+    return float(val)
 
+
+# (column, coercer) pairs in INSERT_SQL order, built once
+COLUMN_COERCERS = tuple((col, _desc if col == "FoodDescription" else _num) for col in COLUMNS)
+
+
+def _row_values(json_data: dict) -> tuple:
+    """Convert one food record into the parameter tuple for INSERT_SQL."""
+    get = json_data.get
+    return tuple([coerce(get(col)) for col, coerce in COLUMN_COERCERS])
+
+
+def _connect() -> sqlite3.Connection:
+    """Open DB_PATH, applying the WAL pragmas when DB_USE_WAL is set."""
     conn = sqlite3.connect(DB_PATH)
+    if DB_USE_WAL:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL: a crash can lose the last commit, not corrupt
+    return conn
+
+
+def insert_food_records(rows: Iterable[dict], conn: Optional[sqlite3.Connection] = None) -> List[int]:
+    """
+    Insert several food records into the Foods table with one executemany
+    inside a single transaction (one commit for the whole batch).
+    Each row must be a dict with keys matching COLUMNS (see _row_values).
+    Rows are converted one at a time as executemany consumes them; a bad value
+    raises mid-batch and the transaction rolls back, so nothing is half-inserted.
+    conn lets a caller reuse an open connection; otherwise one is opened and closed here.
+    Returns the auto-generated FoodIds, in row order.
+    """
+    own_conn = conn is None
+    if conn is None:
+        conn = _connect()
     try:
-        cur = conn.cursor()
-        cur.execute(sql, values)
-        conn.commit()
-        return cur.lastrowid  # type: ignore # The auto-generated FoodId
+        with conn:  # BEGIN ... COMMIT, or ROLLBACK on error
+            count = conn.executemany(INSERT_SQL, (_row_values(r) for r in rows)).rowcount
+            if count <= 0:
+                return []
+            # executemany does not set lastrowid; the batch holds the write lock, so its
+            # rowids are the consecutive values ending at last_insert_rowid()
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last_id - count + 1, last_id + 1))
     finally:
-        conn.close()
+        if own_conn:
+            conn.close()
+
+
+def insert_food_record(json_data: dict, conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Insert a single food record into the Foods table.
+    json_data must be a dict with keys exactly matching COLUMNS.
+    Returns the auto-generated FoodId.
+    """
+    return insert_food_records([json_data], conn)[0]
 
 
 # -------------------------
@@ -108,13 +151,16 @@ class InsetNIPApp(tk.Tk):
         self.title("Insert NIP into foods.db")
         self.geometry("900x600")
 
+        # One connection for the life of the window (opened on first insert)
+        self._conn: Optional[sqlite3.Connection] = None
+
         # Top instructions label
         label = tk.Label(
             self,
             text=(
                 "Paste JSON for one food record into the box below, then click [Insert].\n"
-                "The JSON must be a single object with keys matching the Foods table "
-                "(excluding FoodId).\n"
+                "The JSON must be an object (or an array of objects) with keys matching "
+                "the Foods table (excluding FoodId).\n"
                 "A 'notes' field (if present) will be ignored. Any null numeric values "
                 "are treated as 0.00."
             ),
@@ -159,6 +205,22 @@ class InsetNIPApp(tk.Tk):
         )
         quit_button.pack(side="right")
 
+    def destroy(self):
+        """Close the cached database connection along with the window."""
+        if self._conn is not None:
+            try:
+                self._conn.execute("PRAGMA optimize")  # refresh planner stats touched this session
+            except sqlite3.Error:
+                pass  # e.g. database locked by the diet app; closing matters more
+            self._conn.close()
+            self._conn = None
+        super().destroy()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect()
+        return self._conn
+
     # ------------- Event handlers -------------
 
     def on_clear_clicked(self):
@@ -175,7 +237,7 @@ class InsetNIPApp(tk.Tk):
 
         # Parse JSON
         try:
-            data = json.loads(raw_text)
+            data = _json_loads(raw_text)
         except json.JSONDecodeError as e:
             messagebox.showerror(
                 "JSON Error",
@@ -183,29 +245,32 @@ class InsetNIPApp(tk.Tk):
             )
             return
 
-        # Must be a single object representing one row
-        if not isinstance(data, dict):
+        # One object is one row; an array of objects is inserted as one batch
+        records = data if isinstance(data, list) else [data]
+        if not records or not all(isinstance(r, dict) for r in records):
             messagebox.showerror(
                 "JSON Error",
-                "Expected a single JSON object representing one food record."
+                "Expected a JSON object (or an array of objects) representing food records."
             )
             return
 
         # Check for required keys (they must at least exist; values may be null)
-        missing = [col for col in COLUMNS if col not in data]
-        if missing:
-            messagebox.showerror(
-                "Validation Error",
-                "The following required keys are missing:\n\n"
-                + ", ".join(missing)
-            )
-            return
+        for i, record in enumerate(records, 1):
+            missing = [col for col in COLUMNS if col not in record]
+            if missing:
+                where = f" in record {i}" if len(records) > 1 else ""
+                messagebox.showerror(
+                    "Validation Error",
+                    f"The following required keys are missing{where}:\n\n"
+                    + ", ".join(missing)
+                )
+                return
 
         # Compute extra keys, ignoring known harmless ones like "notes"
-        extra = [
-            k for k in data.keys()
+        extra = list(dict.fromkeys(
+            k for record in records for k in record.keys()
             if (k not in COLUMNS and k not in IGNORED_EXTRA_KEYS)
-        ]
+        ))
 
         # If there are extra fields other than the ignored ones, warn the user
         if extra:
@@ -218,9 +283,9 @@ class InsetNIPApp(tk.Tk):
             if not proceed:
                 return
 
-        # Attempt to insert
+        # Attempt to insert (all records in one transaction)
         try:
-            food_id = insert_food_record(data)
+            food_ids = insert_food_records(records, self._get_conn())
         except Exception as e:
             messagebox.showerror(
                 "Database Error",
@@ -228,10 +293,17 @@ class InsetNIPApp(tk.Tk):
             )
             return
 
-        messagebox.showinfo(
-            "Success",
-            f"Inserted food record successfully.\nNew FoodId = {food_id}"
-        )
+        if len(food_ids) == 1:
+            messagebox.showinfo(
+                "Success",
+                f"Inserted food record successfully.\nNew FoodId = {food_ids[0]}"
+            )
+        else:
+            messagebox.showinfo(
+                "Success",
+                f"Inserted {len(food_ids)} food records successfully.\n"
+                f"New FoodIds = {food_ids[0]}–{food_ids[-1]}"
+            )
 
 
 # -------------------------
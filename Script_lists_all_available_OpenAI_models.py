@@ -1,13 +1,15 @@
 # This script lists all available models from the OpenAI API.from openai import OpenAI
+from operator import attrgetter
 from openai import OpenAI
 
 client = OpenAI()
 
 # Fetch models
 models = client.models.list()
+data = sorted(models.data, key=attrgetter("id"))  # sort once, reuse below
 
 # Display some useful information about each model
-for m in sorted(models.data, key=lambda x: x.id):
+for m in data:
     print(f"ID: {m.id}")
     if hasattr(m, "created"):
         print(f"  Created: {m.created}")
@@ -25,7 +27,7 @@ print(f"\nFound {len(models.data)} models available to this API key:\n")
 
 
 n = 0
-for m in sorted(models.data, key=lambda x: x.id):
+for m in data:
     if m.id.startswith("gpt-") and m.id != "gpt-image-1":
         n += 1
         print(f"- {m.id}")
@@ -2,8 +2,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter.scrolledtext import ScrolledText
 from pathlib import Path
+import bisect
 import json
+import os
 import re
+try:
+    import orjson  # optional; reads/writes the state file as bytes directly
+except ImportError:
+    orjson = None
 
 # -----------------------
 # Layout constants (px)
@@ -21,6 +27,9 @@ TEXT_H = WINDOW_H - 80
 
 STATE_FILE = ".textpadsimple_state.json"   # stored next to this .py file
 
+# Filename sanitizer: anything outside this set (including non-ASCII) becomes "_"
+FILENAME_UNSAFE_REGEX = re.compile(r"[^A-Za-z0-9._ \-]")
+
 class BasicTextPad(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -38,6 +47,12 @@ class BasicTextPad(tk.Tk):
         # Tracks which base filename (stem) is currently loaded in the editor
         self.current_name: str | None = None
 
+        # State file bytes as last read/written, so an unchanged state is not rewritten on close
+        self._state_bytes: bytes | None = None
+
+        # (base_dir mtime_ns, sorted stems) from the last directory scan
+        self._names_cache: tuple[int, tuple[str, ...]] | None = None
+
         # --- Widgets ---------------------------------------------------------
         self.lbl_name = tk.Label(self, text="Filename (no .txt):")
         self.lbl_name.place(x=PADX, y=PADY)
@@ -85,8 +100,17 @@ class BasicTextPad(tk.Tk):
     # Helpers
     # -----------------------
     def list_txt_basenames(self):
-        """Return a sorted list of filenames (without .txt) in base_dir."""
-        return sorted(p.stem for p in self.base_dir.glob("*.txt"))
+        """
+        Return the sorted filenames (without .txt) in base_dir.
+        Cached until base_dir's mtime changes (any file created, renamed or deleted)
+        or the app saves a file itself; coarse directory timestamps can miss a change.
+        """
+        mtime_ns = os.stat(self.base_dir).st_mtime_ns
+        if self._names_cache is not None and self._names_cache[0] == mtime_ns:
+            return self._names_cache[1]
+        names = tuple(sorted(p.stem for p in self.base_dir.glob("*.txt")))
+        self._names_cache = (mtime_ns, names)
+        return names
 
     def refresh_combobox(self):
         names = self.list_txt_basenames()
@@ -95,10 +119,9 @@ class BasicTextPad(tk.Tk):
     @staticmethod
     def _sanitize_filename(name: str) -> str:
         """Constrain filename to safe characters."""
-        name = name.strip()
-        name = re.sub(r"[^A-Za-z0-9._ \-]", "_", name)
-        name = re.sub(r"\s+", " ", name)
-        return name
+        name = FILENAME_UNSAFE_REGEX.sub("_", name.strip())
+        # Only plain spaces survive the pass above, so collapsing runs needs no second regex
+        return " ".join(name.split())
 
     def _select_combo_item(self, name: str):
         """Select 'name' in the combobox and focus it, if present."""
@@ -110,15 +133,21 @@ class BasicTextPad(tk.Tk):
     def _persist_state(self):
         """Save last loaded file stem (if any) to the state file."""
         data = {"last_file": self.current_name}
+        payload = orjson.dumps(data) if orjson is not None else json.dumps(data).encode("utf-8")
+        if payload == self._state_bytes:
+            return  # same as on disk
         try:
-            self.state_path.write_text(json.dumps(data), encoding="utf-8")
+            self.state_path.write_bytes(payload)
+            self._state_bytes = payload
         except Exception:
             pass  # non-fatal
 
     def _load_state(self):
         """Return last_file stem or None."""
         try:
-            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            raw = self.state_path.read_bytes()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            self._state_bytes = raw
             return data.get("last_file")
         except Exception:
             return None
@@ -169,15 +198,15 @@ class BasicTextPad(tk.Tk):
                 ):
                     return
             target.write_text(text, encoding="utf-8")
+            self._names_cache = None
         except Exception as e:
             messagebox.showerror("Save failed", f"Could not save file:\n{e}")
             return
 
         # Update combobox list if new
-        current = list(self.cbo_files["values"])
+        current = list(self.cbo_files["values"])  # already sorted
         if name not in current:
-            current.append(name)
-            current.sort()
+            bisect.insort(current, name)
             self.cbo_files["values"] = current
 
         # Mark as the current open file
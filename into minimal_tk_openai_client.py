@@ -1,16 +1,18 @@
 """
 Minimal Tkinter + Streaming OpenAI Client
 - Python 3.11+
-- Tkinter mainloop kept responsive (thread + queue)
+- Tkinter mainloop kept responsive (background asyncio loop + queue)
 - Streaming via openai-python SDK
 - Retries, timeouts, rotating logs
 - JSON config persistence (model, temperature, system prompt, geometry)
-- Rough token/cost estimate (editable pricing in config)
+- Token/cost estimate (exact with tiktoken installed; editable pricing in config)
 - Shortcuts: Ctrl+Enter=Send, Ctrl+S=Save Chat, Ctrl+L=Clear Input
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import functools
 import json
 import logging
 import math
@@ -28,7 +30,13 @@ from tkinter import ttk, messagebox, filedialog
 
 # --- OpenAI SDK (official) ---
 # pip install --upgrade openai
-from openai import OpenAI, DefaultHttpxClient  # type: ignore
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient  # type: ignore
+
+# Optional: pip install tiktoken for exact token counts in the cost estimate
+try:
+    import tiktoken  # type: ignore
+except ImportError:
+    tiktoken = None
 
 # --- Logging --------------------------------------------------------------
 
@@ -54,12 +62,14 @@ from logging.handlers import RotatingFileHandler
 
 logger = logging.getLogger("tk_openai")
 logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(LOG_DIR / "app.log", maxBytes=512_000, backupCount=3)
-formatter = logging.Formatter(
-    "%(asctime)s | %(levelname)s | %(threadName)s | %(name)s | %(message)s"
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+if not logger.handlers:  # a re-import (reload, tests) must not stack a second file handler
+    # delay=True: the log file is only opened when the first record is written
+    handler = RotatingFileHandler(LOG_DIR / "app.log", maxBytes=512_000, backupCount=3, delay=True)
+    formatter = logging.Formatter(
+        "%(asctime)s | %(levelname)s | %(threadName)s | %(name)s | %(message)s"
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
 
 # --- Config ---------------------------------------------------------------
 
@@ -69,6 +79,14 @@ DEFAULT_MODELS = [
     "gpt-4o",
 ]
 
+# How often the UI drains the stream queue; tokens arriving in between are inserted together
+POLL_INTERVAL_MS = 50
+MAX_DRAIN_PER_POLL = 256  # queue items handled per tick, so a burst can't stall the UI
+SPINNER_INTERVAL_S = 0.12  # "Thinking…" spinner frame period, advanced from the poll tick
+
+# Quiet period after the last temperature-slider move before the config is written
+CONFIG_SAVE_DEBOUNCE_MS = 400
+
 @dataclass
 class Pricing:
     input_per_1k: float = 0.0  # USD per 1K input tokens
@@ -103,11 +121,17 @@ class AppConfig:
             prices=prices,
         )
 
+# Bytes of config.json as last read or written, so unchanged configs are not rewritten
+_LAST_CONFIG_BYTES: bytes | None = None
+
 def load_config() -> AppConfig:
+    global _LAST_CONFIG_BYTES
     APP_DIR.mkdir(parents=True, exist_ok=True)
     if CONFIG_PATH.exists():
         try:
-            cfg = AppConfig.from_json(CONFIG_PATH.read_text(encoding="utf-8"))
+            raw = CONFIG_PATH.read_bytes()
+            cfg = AppConfig.from_json(raw.decode("utf-8"))
+            _LAST_CONFIG_BYTES = raw
             logger.info("Config loaded from %s", CONFIG_PATH)
             return cfg
         except Exception as exc:
@@ -123,24 +147,32 @@ def load_config() -> AppConfig:
     return cfg
 
 def save_config(cfg: AppConfig) -> None:
+    global _LAST_CONFIG_BYTES
+    data = cfg.to_json().encode("utf-8")
+    if data == _LAST_CONFIG_BYTES:
+        return  # nothing changed since the last read/write
     tmp = CONFIG_PATH.with_suffix(".json.tmp")
-    tmp.write_text(cfg.to_json(), encoding="utf-8")
+    tmp.write_bytes(data)
     tmp.replace(CONFIG_PATH)
+    _LAST_CONFIG_BYTES = data
     logger.info("Config saved to %s", CONFIG_PATH)
 
 # --- Env / API key --------------------------------------------------------
 
 def read_env_file(path: Path) -> Dict[str, str]:
     """Tiny .env reader; avoids extra dependencies."""
-    if not path.exists():
-        return {}
     values: Dict[str, str] = {}
-    for line in path.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        k, v = line.split("=", 1)
-        values[k.strip()] = v.strip().strip('"').strip("'")
+    try:
+        f = path.open("r", encoding="utf-8")  # open directly; no separate exists() stat
+    except FileNotFoundError:
+        return values
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            k, v = line.split("=", 1)
+            values[k.strip()] = v.strip().strip('"').strip("'")
     return values
 
 def load_api_key() -> Optional[str]:
@@ -170,50 +202,66 @@ def rough_token_count(text: str) -> int:
         return 0
     return max(1, math.ceil(len(text) / 4))
 
+@functools.lru_cache(maxsize=8)
+def _encoding_for(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")  # newer model names tiktoken doesn't know yet
+
+@functools.lru_cache(maxsize=1024)
+def count_tokens(model: str, text: str) -> int:
+    """
+    Token count for one message: exact with tiktoken installed, else rough_token_count.
+    Cached per (model, text), so earlier turns aren't re-counted on every send.
+    """
+    if tiktoken is None or not text:
+        return rough_token_count(text)
+    return len(_encoding_for(model).encode_ordinary(text))
+
 class OpenAIClientWrapper:
-    """Thin wrapper with retries, timeout, and streaming support."""
+    """Thin wrapper with retries, timeout, and streaming support (retries are the SDK's own)."""
 
     def __init__(self, api_key: str, timeout_s: float = 30.0, max_retries: int = 3):
-        self._client = OpenAI(
+        try:
+            import h2  # type: ignore  # noqa: F401  (httpx[http2]: multiplex requests on one TLS connection)
+            http2 = True
+        except ImportError:
+            http2 = False
+        # One pooled keep-alive client for the app's lifetime, so turns reuse the connection.
+        # The SDK retries connection errors, 429s and 5xx with jittered backoff, and fails fast
+        # on auth/4xx errors; max_retries here counts total attempts, the SDK's counts retries.
+        self._client = AsyncOpenAI(
             api_key=api_key,
-            http_client=DefaultHttpxClient(timeout=timeout_s),  # official hook
+            http_client=DefaultAsyncHttpxClient(http2=http2),  # official hook
+            timeout=timeout_s,
+            max_retries=max(0, max_retries - 1),
         )
-        self._max_retries = max_retries
 
-    def stream_chat(
+    async def stream_chat(
         self,
         messages: List[Dict[str, Any]],
         model: str,
         temperature: float,
     ):
-        """Generator yielding text chunks; raises on persistent failure."""
-        delay = 1.0
-        for attempt in range(1, self._max_retries + 1):
+        """Async generator yielding text chunks; raises on persistent failure."""
+        # Only opening the stream is retried (by the SDK): once text has been yielded,
+        # a restart would show it twice, so mid-stream failures propagate to the caller.
+        stream = await self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        async for chunk in stream:
+            # SDK yields deltas; we only care about text. Nearly every chunk has one, so
+            # EAFP beats getattr; the rare chunk without choices (e.g. usage-only) is skipped.
             try:
-                stream = self._client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    stream=True,
-                )
-                for chunk in stream:
-                    # SDK yields deltas; we only care about text
-                    delta = chunk.choices[0].delta
-                    piece = getattr(delta, "content", None)
-                    if piece:
-                        yield piece
-                return
-            except Exception as exc:
-                # Backoff on transient network / rate-limit issues
-                if attempt >= self._max_retries:
-                    logger.exception("OpenAI error after %s attempts: %s", attempt, exc)
-                    raise
-                logger.warning(
-                    "OpenAI error (attempt %s/%s): %s; retrying in %.1fs",
-                    attempt, self._max_retries, exc, delay,
-                )
-                time.sleep(delay)
-                delay = min(delay * 2, 8.0)
+                piece = chunk.choices[0].delta.content
+            except (AttributeError, IndexError):
+                continue
+            if piece:
+                yield piece
 
 # --- Tkinter App ----------------------------------------------------------
 
@@ -225,11 +273,20 @@ class ChatApp(tk.Tk):
         self.cfg = cfg
 
         # State
-        self.messages: List[Dict[str, Any]] = []
-        self.stream_q: queue.Queue[Tuple[str, Any]] = queue.Queue()
+        # messages[0] is always the system slot, so prompt edits are an in-place assignment
+        self.messages: List[Dict[str, Any]] = [{"role": "system", "content": self.cfg.system_prompt}]
+        self.stream_q: queue.SimpleQueue[Tuple[str, Any]] = queue.SimpleQueue()  # one producer, one consumer
         self.sending = False
         self.spinner_idx = 0
         self.spinner_frames = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+        self._last_spin = 0.0  # time.monotonic() of the last spinner frame
+        self._transcript: List[str] = []  # everything inserted into self.chat, for saving
+
+        # One background asyncio loop runs every request (no thread per send); results
+        # come back to the Tk thread through stream_q
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="OpenAILoop").start()
+        self._save_after_id: str | None = None  # pending debounced save_config, if any
 
         # UI
         self._build_menu()
@@ -242,12 +299,7 @@ class ChatApp(tk.Tk):
         self.bind_all("<Control-s>", lambda e: self.on_save_chat())
         self.bind_all("<Control-l>", lambda e: self.on_clear_input())
 
-        # Initial system message
-        if self.cfg.system_prompt.strip():
-            self.messages.append({"role": "system", "content": self.cfg.system_prompt})
-
         self.after(100, self._poll_queue)
-        self.after(120, self._tick_spinner)
 
     # --- UI builders ---
     def _build_menu(self) -> None:
@@ -342,7 +394,14 @@ class ChatApp(tk.Tk):
         save_config(self.cfg)
 
     def _save_temp(self, _evt: Any = None) -> None:
+        # The Scale fires on every pixel of a drag: update cfg now, write once it settles
         self.cfg.temperature = float(self.temp_var.get())
+        if self._save_after_id is not None:
+            self.after_cancel(self._save_after_id)
+        self._save_after_id = self.after(CONFIG_SAVE_DEBOUNCE_MS, self._flush_config)
+
+    def _flush_config(self) -> None:
+        self._save_after_id = None
         save_config(self.cfg)
 
     # --- Menu commands ---
@@ -376,7 +435,8 @@ class ChatApp(tk.Tk):
         if not path:
             return
         try:
-            text = self.chat.get("1.0", "end-1c")
+            text = "".join(self._transcript)  # mirror of the widget; no Tcl round-trip
+            self._transcript[:] = [text]  # keep it as one string from now on
             Path(path).write_text(text, encoding="utf-8")
             self.set_status(f"Saved chat to {path}")
         except Exception as exc:
@@ -399,12 +459,8 @@ class ChatApp(tk.Tk):
 
         def save_and_close() -> None:
             self.cfg.system_prompt = txt.get("1.0", "end-1c")
-            save_config(self.cfg)
-            # Refresh system message in the active conversation if first message is system
-            if self.messages and self.messages[0]["role"] == "system":
-                self.messages[0]["content"] = self.cfg.system_prompt
-            else:
-                self.messages.insert(0, {"role": "system", "content": self.cfg.system_prompt})
+            save_config(self.cfg)  # no-op if the prompt was saved unchanged
+            self.messages[0]["content"] = self.cfg.system_prompt  # refresh the active conversation
             dlg.destroy()
 
         btn = ttk.Button(dlg, text="Save", command=save_and_close)
@@ -434,87 +490,115 @@ class ChatApp(tk.Tk):
         # Insert assistant header
         self._append("assistant", "", head_only=True)
 
-        def worker():
-            try:
-                t0 = time.time()
-                prompt_text = "".join(m.get("content", "") for m in self.messages)
-                prompt_tokens = rough_token_count(prompt_text)
-                out_accum: List[str] = []
-
-                for piece in self.client.stream_chat(self.messages, model, temp):
-                    out_accum.append(piece)
-                    self.stream_q.put(("token", piece))
-
-                output_text = "".join(out_accum)
-                output_tokens = rough_token_count(output_text)
-                dt = time.time() - t0
-
-                self.stream_q.put((
-                    "done",
-                    {
-                        "prompt_tokens": prompt_tokens,
-                        "output_tokens": output_tokens,
-                        "elapsed": dt,
-                        "model": model,
-                    },
-                ))
-            except Exception as exc:
-                self.stream_q.put(("error", str(exc)))
-
-        threading.Thread(target=worker, daemon=True, name="OpenAIWorker").start()
+        # An empty system prompt is left out of the request rather than sent blank
+        messages = self.messages if self.messages[0]["content"].strip() else self.messages[1:]
+
+        asyncio.run_coroutine_threadsafe(self._stream_reply(messages, model, temp), self.loop)
+
+    async def _stream_reply(self, messages: List[Dict[str, Any]], model: str, temp: float) -> None:
+        """Runs on the background loop; reports tokens, then done or error, through stream_q."""
+        try:
+            t0 = time.time()
+            prompt_tokens = sum(count_tokens(model, m.get("content", "")) for m in messages)
+            out_accum: List[str] = []
+
+            async for piece in self.client.stream_chat(messages, model, temp):
+                out_accum.append(piece)
+                self.stream_q.put(("token", piece))
+
+            output_text = "".join(out_accum)
+            output_tokens = count_tokens(model, output_text)  # cached for the next send too
+            dt = time.time() - t0
+
+            self.stream_q.put((
+                "done",
+                {
+                    "prompt_tokens": prompt_tokens,
+                    "output_tokens": output_tokens,
+                    "elapsed": dt,
+                    "model": model,
+                    "text": output_text,
+                },
+            ))
+        except Exception as exc:
+            self.stream_q.put(("error", str(exc)))
 
     # --- Queue / UI update loop ---
     def _poll_queue(self) -> None:
+        # Join every token drained this tick into one Text insert; "done"/"error"
+        # first flush what came before them so ordering is preserved.
+        pieces: List[str] = []
         try:
-            while True:
+            for _ in range(MAX_DRAIN_PER_POLL):
                 kind, payload = self.stream_q.get_nowait()
                 if kind == "token":
-                    self._append_stream_piece(payload)
-                elif kind == "done":
+                    pieces.append(payload)
+                    continue
+                if pieces:
+                    self._append_stream_piece("".join(pieces))
+                    pieces.clear()
+                if kind == "done":
                     self._finalize_assistant(payload)
                 elif kind == "error":
                     self._handle_error(payload)
         except queue.Empty:
             pass
         finally:
-            self.after(40, self._poll_queue)
+            if pieces:
+                self._append_stream_piece("".join(pieces))
+            self._advance_spinner()
+            self.after(POLL_INTERVAL_MS, self._poll_queue)
+
+    def _advance_spinner(self) -> None:
+        # Runs from the poll tick (one timer instead of two); the status only changes
+        # while sending and once per SPINNER_INTERVAL_S
+        if not self.sending:
+            return
+        now = time.monotonic()
+        if now - self._last_spin < SPINNER_INTERVAL_S:
+            return
+        self._last_spin = now
+        self.spinner_idx = (self.spinner_idx + 1) % len(self.spinner_frames)
+        self.set_status("Thinking… " + self.spinner_frames[self.spinner_idx])
 
-    def _tick_spinner(self) -> None:
-        if self.sending:
-            self.spinner_idx = (self.spinner_idx + 1) % len(self.spinner_frames)
-            self.set_status("Thinking… " + self.spinner_frames[self.spinner_idx])
-        self.after(120, self._tick_spinner)
+    def _chat_insert(self, text: str, tags: Tuple[str, ...] = ()) -> None:
+        """Insert at the end of the transcript (caller toggles state) and mirror it for saving."""
+        self.chat.insert("end", text, tags)
+        self._transcript.append(text)
 
     def _append(self, role: str, text: str, head_only: bool = False) -> None:
         self.chat.configure(state="normal")
         if role == "user":
-            self.chat.insert("end", "You: ", ("role_user",))
-            self.chat.insert("end", text + "\n\n")
+            self._chat_insert("You: ", ("role_user",))
+            self._chat_insert(text + "\n\n")
         elif role == "assistant":
-            self.chat.insert("end", "Assistant: ", ("role_assistant",))
+            self._chat_insert("Assistant: ", ("role_assistant",))
             if not head_only:
-                self.chat.insert("end", text + "\n\n")
+                self._chat_insert(text + "\n\n")
         elif role == "system":
-            self.chat.insert("end", "System: ", ("role_system",))
-            self.chat.insert("end", text + "\n\n")
+            self._chat_insert("System: ", ("role_system",))
+            self._chat_insert(text + "\n\n")
         self.chat.see("end")
         self.chat.configure(state="disabled")
 
     def _append_stream_piece(self, piece: str) -> None:
+        # Check before inserting: only follow the stream if the user hasn't scrolled up to read
+        # back (small tolerance since yview fractions can land just under 1.0 at the bottom)
+        follow = self.chat.yview()[1] > 0.999
         self.chat.configure(state="normal")
-        self.chat.insert("end", piece)
-        self.chat.see("end")
+        self._chat_insert(piece)
+        if follow:
+            self.chat.see("end")
         self.chat.configure(state="disabled")
 
     def _finalize_assistant(self, meta: Dict[str, Any]) -> None:
         # Finish assistant line with spacing
         self.chat.configure(state="normal")
-        self.chat.insert("end", "\n\n")
+        self._chat_insert("\n\n")
         self.chat.configure(state="disabled")
 
-        # Add to message history
-        last_assistant_text = self._get_last_assistant_block_text()
-        self.messages.append({"role": "assistant", "content": last_assistant_text})
+        # Add to message history (the worker's own copy; no need to read it back from the widget)
+        self.messages.append({"role": "assistant", "content": str(meta.get("text", ""))})
 
         # Update status with token/cost estimate
         prompt_t = int(meta.get("prompt_tokens", 0))
@@ -544,25 +628,20 @@ class ChatApp(tk.Tk):
         cost = (t_in / 1000) * pr.input_per_1k + (t_out / 1000) * pr.output_per_1k
         return f"est. cost: ${cost:.4f}"
 
-    def _get_last_assistant_block_text(self) -> str:
-        # Find the "Assistant:" label from the end and get following text until blank line
-        text = self.chat.get("1.0", "end-1c")
-        anchor = "Assistant: "
-        idx = text.rfind(anchor)
-        if idx == -1:
-            return ""
-        return text[idx + len(anchor):].rstrip()
-
     def set_status(self, msg: str) -> None:
         self.status_var.set(msg)
 
     # --- Closing / geometry ---
     def destroy(self) -> None:  # type: ignore[override]
+        if self._save_after_id is not None:
+            self.after_cancel(self._save_after_id)  # the save below covers it
+            self._save_after_id = None
         try:
             self.cfg.geometry = self.geometry()
             save_config(self.cfg)
         except Exception:
             pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
         super().destroy()
 
 # --- Main -----------------------------------------------------------------
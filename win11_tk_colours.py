@@ -45,17 +45,15 @@ CSS_SVG_COLOURS = {
     "slategray","slategrey","snow","springgreen","steelblue","tan","teal","thistle",
     "tomato","turquoise","violet","wheat","white","whitesmoke","yellow","yellowgreen",
     # A few X11-style TK specials that commonly exist on Windows builds:
-    "aliceblue","antiquewhite1","antiquewhite2","antiquewhite3","antiquewhite4",
+    "antiquewhite1","antiquewhite2","antiquewhite3","antiquewhite4",
     "azure1","azure2","azure3","azure4","blue1","blue2","blue3","blue4",
     "gray0","gray100","grey0","grey100","LightGoldenrodYellow","DeepSkyBlue2",
 }
 
-def gray_names():
-    out = set()
-    for i in range(0, 101):
-        out.add(f"gray{i}")
-        out.add(f"grey{i}")
-    return out
+GRAY_NAMES = frozenset(f"{g}{i}" for g in ("gray", "grey") for i in range(101))
+
+# Built-in candidates, merged once at import; main() only adds names from rgb.txt files
+BASE_CANDIDATES = frozenset(WINDOWS_SYSTEM_COLOURS | CSS_SVG_COLOURS | GRAY_NAMES)
 
 def load_x11_names_from_file():
     names = set()
@@ -75,12 +73,19 @@ def load_x11_names_from_file():
                 pass
     return names
 
-def is_valid_tk_colour(root, name: str) -> bool:
-    try:
-        root.winfo_rgb(name)
-        return True
-    except tk.TclError:
-        return False
+def valid_tk_colours(root, names) -> list:
+    """
+    Return the names Tk accepts as colours. All candidates are checked in one Tcl
+    foreach (one interpreter call instead of one winfo_rgb round-trip per name);
+    the names are passed as an argument to an apply lambda, so no quoting is needed
+    and its variables stay local instead of lingering in the interpreter.
+    """
+    result = root.tk.call(
+        "apply",
+        "names {set out {}; foreach n $names {if {![catch {winfo rgb . $n}]} {lappend out $n}}; return $out}",
+        tuple(names),
+    )
+    return list(root.tk.splitlist(result))
 
 def main():
     # Windows console: ensure UTF-8 so weird names print nicely
@@ -92,14 +97,10 @@ def main():
 
     root = tk.Tk(); root.withdraw()
 
-    candidates = set()
-    candidates |= WINDOWS_SYSTEM_COLOURS
-    candidates |= CSS_SVG_COLOURS
-    candidates |= gray_names()
-    candidates |= load_x11_names_from_file()
+    candidates = BASE_CANDIDATES | load_x11_names_from_file()
 
     # Validate via Tk (source of truth)
-    valid = sorted({n for n in candidates if is_valid_tk_colour(root, n)} , key=lambda s: s.lower())
+    valid = sorted(set(valid_tk_colours(root, candidates)), key=lambda s: s.lower())
 
     # Output
     for name in valid: